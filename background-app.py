@@ -2,21 +2,35 @@ import base64
 import ctypes
 import datetime
 import hashlib
-import json
 import logging
 import os
 import shutil
 import time
 import threading
 import pystray
-import psutil
-import requests
 from pystray import MenuItem as Item
 from PIL import Image
 from dotenv import load_dotenv
 from dateutil import tz
 from datetime import datetime, timezone
 
+import batch_commit
+import check_pipeline
+import chunk_store
+import delta
+import directory_walker
+import file_compression
+import file_options
+import file_transfer
+import file_watcher
+import github_client
+import hash_cache
+import job_scheduler
+import process_monitor
+import remote_snapshot
+import settings_store
+import state_db
+
 
 # Load environment variables from .env file
 load_dotenv()
@@ -27,15 +41,13 @@ GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 HEADERS = {'Authorization': f'token {GITHUB_TOKEN}'}
 
 # Variable setup
-game_was_opened = False
-game_check_notification = False
-tracking_file = 'files_to_track.json'
 console_hidden = False
-file_check_done = False
-monitor_check_done = True
-first_run_check = True
-file_check_active = False
-game_check_active = False
+watch_timeout = 60 * 60  # seconds, how long the watcher waits for a change before waiting again
+scheduler = job_scheduler.JobScheduler()  # runs every check, one at a time
+first_check_done = threading.Event()
+watched_files = {}  # local paths watched for changes, by GitHub path
+pending_changes = set()  # GitHub paths of watched files that changed and haven't been checked yet
+pending_changes_lock = threading.Lock()
 
 
 # Function to print to the console and log at the same time
@@ -49,64 +61,22 @@ def print_and_log(message_to_print, logging_func):
         logging.error(f"Invalid logging function specified for message: {message_to_print}")
 
 
-# Function to save options to the JSON file
+# Function to save options to the JSON file (written shortly after, so several changes cost one write)
 def save_settings(settings):
-    with open(tracking_file, 'w') as f:
-        json.dump(settings, f, indent=4)
+    settings_store.save_settings(settings)
 
 
-# Function to load settings from the JSON file
+# Function to load settings from the JSON file (kept in memory, and only read again if the file changed)
 def load_settings(silent=False):
-    if not os.path.exists(tracking_file):
-        save_settings({"do_setup": True, "blacklist": [], 'process_watchlist': [], "files_to_track": {},
-                       "file_check_interval": 60, "game_check_interval": 90, "show_console_if_input": True})
-        print_and_log("File not found. Created new default tracking file.", logging.info)
-    with open(tracking_file, 'r') as f:
-        settings = json.load(f)
-        if not silent:
-            print_and_log("Successfully loaded tracking file.", logging.info)
-
-    # Check if needed settings exist and create them if not
-    if 'do_setup' not in settings:
-        settings['do_setup'] = True
-        save_settings(settings)
-        print_and_log("Added 'do_setup' setting.", logging.info)
-    if 'blacklist' not in settings:
-        settings['blacklist'] = []
-        save_settings(settings)
-        print_and_log("Added 'blacklist' setting.", logging.info)
-    if 'process_watchlist' not in settings:
-        settings['process_watchlist'] = []
-        save_settings(settings)
-        print_and_log("Added 'process_watchlist' setting.", logging.info)
-    if 'files_to_track' not in settings:
-        settings['files_to_track'] = {}
-        save_settings(settings)
-        print_and_log("Added 'do_setup' setting.", logging.info)
-    if 'file_check_interval' not in settings:
-        settings['file_check_interval'] = 60
-        save_settings(settings)
-        print_and_log("Added 'file_check_interval' setting.", logging.info)
-    if 'game_check_interval' not in settings:
-        settings['game_check_interval'] = 15
-        save_settings(settings)
-        print_and_log("Added 'game_check_interval' setting.", logging.info)
-    if 'show_console_if_input' not in settings:
-        settings['show_console_if_input'] = True
-        save_settings(settings)
-        print_and_log("Added 'show_console_if_input' setting.", logging.info)
-
-    # Check if obsolete settings exists and remove them
-    if 'whitelist' in settings:
-        del settings['whitelist']
-        save_settings(settings)
+    settings = settings_store.load_settings(silent)
+    github_client.configure(settings['http_timeouts'])
     return settings
 
 
 # Get the contents of the file from GitHub
 def get_github_file_content(filename):
     url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{filename}"
-    response = requests.get(url, headers=HEADERS)
+    response = github_client.get(url, headers=HEADERS)
 
     if response.status_code == 200:
         file_info = response.json()
@@ -123,7 +93,7 @@ def get_github_file_content(filename):
 
             # Fetch blob via git/blobs using the SHA
             blob_url = f"https://api.github.com/repos/{GITHUB_REPO}/git/blobs/{blob_sha}"
-            blob_response = requests.get(blob_url, headers=HEADERS)
+            blob_response = github_client.get(blob_url, headers=HEADERS)
 
             if blob_response.status_code == 200:
                 blob_info = blob_response.json()
@@ -140,20 +110,28 @@ def get_github_file_content(filename):
         return None
 
 
-# Hashing function to get the content hash of a file
-def get_file_hash(filename):
-    hasher = hashlib.sha256()  # Use SHA-256 for hashing
-    with open(filename, 'rb') as f:
-        while chunk := f.read(8192):  # Read in chunks to avoid memory issues
-            hasher.update(chunk)
-    return hasher.hexdigest()
+# Function to find the manifest of a file stored in chunks or as deltas on GitHub, returning (path, manifest). The
+# path is None if the file is stored as it is, and the manifest is None if it couldn't be fetched.
+def get_github_manifest(snapshot, github_file):
+    if chunk_store.is_chunked_on_github(snapshot, github_file):
+        return chunk_store.manifest_path(github_file), chunk_store.fetch_manifest(GITHUB_REPO, HEADERS, github_file)
+    if delta.is_delta_on_github(snapshot, github_file):
+        return delta.manifest_path(github_file), delta.fetch_manifest(GITHUB_REPO, HEADERS, github_file)
+    return None, None
+
+
+# Function to get the SHA-256 of a GitHub file's uncompressed content if it was uploaded compressed, or None
+def get_github_content_hash(github_file, snapshot):
+    sha, size = snapshot[github_file]
+    url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/{remote_snapshot.branch_name}/{github_file}"
+    return file_compression.remote_content_hash(url, HEADERS, sha, size)
 
 
 # Get last modified date of the GitHub file by finding the latest commit
 def get_github_last_modified(filename):
     url = f"https://api.github.com/repos/{GITHUB_REPO}/commits"
     params = {'path': filename, 'per_page': 1}  # Only fetch the most recent commit affecting the file
-    response = requests.get(url, headers=HEADERS, params=params)
+    response = github_client.get(url, headers=HEADERS, params=params)
 
     if response.status_code == 200:
         commit_data = response.json()
@@ -165,40 +143,140 @@ def get_github_last_modified(filename):
         return None
 
 
-# Compare the local and GitHub files
-def compare_files(github_file, local_file, show_console_for_input=False):
+# Check stage 1: hash the local copy of a tracked file (from_root is set for files found in a tracked directory)
+def hash_tracked_file(github_file, local_file, compare_mode='blob_sha', from_root=False):
+    print()
+    print(f"Checking file: {github_file}...")
+    print()
+    item = {'github_file': github_file, 'local_file': local_file, 'action': None, 'from_root': from_root}
+
     # Check if the local file exists
+    if not os.path.exists(local_file) and from_root:
+        if state_db.was_synced(github_file):
+            # It was synced here before, so it was deleted locally rather than added on GitHub
+            print(f"{local_file} was deleted locally. Keeping the GitHub copy.")
+            item['action'] = 'skip'
+            item['deleted'] = True
+            return item
+        # Files in a tracked directory that are only on GitHub were added from another machine
+        print(f"{github_file} is new on GitHub. Downloading it to {local_file}.")
+        item['action'] = 'download'
+        return item
     if not os.path.exists(local_file):
         print(f"Local file {local_file} is missing. Removing from tracking.")
-        return False  # Indicate that the file should be removed
-
-    # Fetch the GitHub file content
-    github_hash = get_github_file_content(github_file)
-    if github_hash is None:
-        print(f"GitHub file {github_file} is missing. Removing from tracking.")
-        return False  # Indicate that the file should be removed
-
-    # GitHub file content is base64-encoded, so we need to decode it
-    import base64
-    github_hash_decoded = hashlib.sha256(base64.b64decode(github_hash)).hexdigest()
-
-    local_hash = get_file_hash(local_file)
+        item['action'] = 'remove'  # Indicate that the file should be removed
+        return item
 
-    print(f"Local file hash: {local_hash}")
-    print(f"GitHub file hash: {github_hash_decoded}")
+    if compare_mode == 'blob_sha':
+        item['local_hash'] = hash_cache.get_git_blob_sha(local_file)
+    else:
+        item['local_hash'] = hash_cache.get_file_hash(local_file)
+    return item
+
+
+# Function to decide what to do with a file in a tracked directory that isn't on GitHub: one synced here before was
+# deleted on GitHub, anything else is new and is uploaded
+def root_file_missing_on_github(item):
+    if state_db.was_synced(item['github_file']):
+        print(f"{item['github_file']} was deleted on GitHub. Keeping the local copy.")
+        item['action'] = 'skip'
+        item['deleted'] = True
+        return item
+    print(f"{item['local_file']} is new in a tracked directory. Uploading it to GitHub.")
+    item['action'] = 'upload'
+    return item
+
+
+# Check stage 2: look up the GitHub copy of a tracked file and when it last changed
+def fetch_remote_file_state(item, compare_mode='blob_sha'):
+    if item['action'] is not None:
+        return item
+    github_file = item['github_file']
+    local_file = item['local_file']
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS)
+    history_file = github_file  # The GitHub path whose commits date the file
+    manifest_file, manifest = get_github_manifest(snapshot, github_file) if snapshot is not None else (None, None)
+
+    if manifest_file is not None:
+        # Chunked and delta-stored files are compared by the SHA-256 of their whole content, which their manifest
+        # records
+        if manifest is None:
+            print(f"Could not fetch the manifest of {github_file}. Skipping it for now.")
+            item['action'] = 'skip'
+            return item
+        item['local_hash'] = hash_cache.get_file_hash(local_file)
+        github_hash = manifest['sha256']
+        history_file = manifest_file
+        print(f"Local file hash: {item['local_hash']}")
+        print(f"GitHub file hash ({manifest_file}): {github_hash}")
+    elif compare_mode == 'blob_sha':
+        # Compare git blob SHAs so no file content has to be downloaded
+        if snapshot is None:
+            print(f"Could not fetch the GitHub file list. Skipping {github_file} for now.")
+            item['action'] = 'skip'  # Keep tracking, the file may still exist on GitHub
+            return item
+        if github_file not in snapshot and item['from_root']:
+            return root_file_missing_on_github(item)
+        if github_file not in snapshot:
+            print(f"GitHub file {github_file} is missing. Removing from tracking.")
+            item['action'] = 'remove'
+            return item
+        github_hash = snapshot[github_file][0]
+        content_hash = None
+        if item['local_hash'] != github_hash:
+            # A compressed upload never matches the local blob SHA, so compare its uncompressed content's SHA-256
+            try:
+                content_hash = get_github_content_hash(github_file, snapshot)
+            except OSError as e:
+                print(f"{e}. Skipping {github_file} for now.")
+                item['action'] = 'skip'
+                return item
+        if content_hash is not None:
+            item['local_hash'] = hash_cache.get_file_hash(local_file)
+            github_hash = content_hash
+            print(f"Local file hash: {item['local_hash']}")
+            print(f"GitHub file hash (compressed): {github_hash}")
+        else:
+            print(f"Local file blob SHA: {item['local_hash']}")
+            print(f"GitHub file blob SHA: {github_hash}")
+    else:
+        # Fetch the GitHub file content
+        github_content = get_github_file_content(github_file)
+        if github_content is None:
+            # Only stop tracking the file if GitHub's file list confirms it is gone, not on any failed request
+            if snapshot is not None and github_file not in snapshot and item['from_root']:
+                return root_file_missing_on_github(item)
+            if snapshot is not None and github_file not in snapshot:
+                print(f"GitHub file {github_file} is missing. Removing from tracking.")
+                item['action'] = 'remove'
+                return item
+            print(f"Could not fetch {github_file} from GitHub. Skipping it for now.")
+            item['action'] = 'skip'
+            return item
+
+        # GitHub file content is base64-encoded, so we need to decode it
+        github_data = base64.b64decode(github_content)
+        header = file_compression.parse_header(github_data)
+        # Compressed uploads carry the SHA-256 of their uncompressed content in their header
+        github_hash = header[1] if header is not None else hashlib.sha256(github_data).hexdigest()
+        print(f"Local file hash: {item['local_hash']}")
+        print(f"GitHub file hash: {github_hash}")
 
     # Check if the files are identical
-    if local_hash == github_hash_decoded:
+    item['github_hash'] = github_hash
+    if item['local_hash'] == github_hash:
         print("Files are identical. No need to update.")
-        return True  # Indicate that the file is okay
+        item['action'] = 'skip'
+        return item
 
     # If hashes differ, check the modification dates
     local_last_modified = os.path.getmtime(local_file)
-    github_last_modified = get_github_last_modified(github_file)
+    github_last_modified = get_github_last_modified(history_file)
 
     if github_last_modified is None:
         print(f"Could not retrieve last modified date from GitHub for {github_file}.")
-        return True  # No need to remove if we can't get the last modified date
+        item['action'] = 'skip'  # No need to remove if we can't get the last modified date
+        return item
 
     # Convert local and GitHub modification dates to datetime objects
     local_datetime = datetime.fromtimestamp(local_last_modified, tz=timezone.utc)
@@ -209,27 +287,30 @@ def compare_files(github_file, local_file, show_console_for_input=False):
 
     print(f"Local last modified date: {format_datetime(local_datetime)}")
     print(f"GitHub last modified date: {format_datetime(github_datetime)}")
+    item['local_is_newer'] = local_datetime > github_datetime
+    return item
+
+
+# Check stage 3: ask what to do with a changed file (runs on the main check thread, one file at a time)
+def choose_file_action(item, show_console_for_input=False):
+    if item['action'] is not None:
+        return item['action']
 
-    if local_datetime > github_datetime:
+    if item['local_is_newer']:
         user_choice = input("Your local file is newer. Do you want to upload it to GitHub? (y/n): ")
         if show_console_for_input:
             if console_hidden:
                 show_console()
         if user_choice.lower() == 'y':
-            # Upload the local file to GitHub
-            print("Uploading local version to GitHub...")
-            upload_to_github(local_file, github_file)
+            return 'upload'
     else:
         user_choice = input("The GitHub file is newer. Do you want to download and replace your local version? (y/n): ")
         if show_console_for_input:
             if console_hidden:
                 show_console()
         if user_choice.lower() == 'y':
-            # Download the GitHub version and replace the local file
-            print("Downloading GitHub version...")
-            download_github_file(github_file, local_file)
-
-    return True  # Indicate that the file is okay
+            return 'download'
+    return 'skip'
 
 
 # Download the selected file from GitHub and save it locally
@@ -238,67 +319,52 @@ def download_github_file(github_file, save_location):
         backup_location = save_location + ".bak"
         shutil.copy2(save_location, backup_location)
         print(f"Backup created at {backup_location}")
+    # Files in a tracked directory can be in folders that don't exist locally yet
+    os.makedirs(os.path.dirname(os.path.abspath(save_location)), exist_ok=True)
 
-    url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main/{github_file}"
-    response = requests.get(url, headers=HEADERS)
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS) or {}
+    if chunk_store.is_chunked_on_github(snapshot, github_file):
+        if chunk_store.restore_chunked(GITHUB_REPO, HEADERS, github_file, save_location):
+            print(f"Downloaded {github_file} to {save_location}")
+            return True
+        print(f"Error downloading {github_file}.")
+        return False
+    if delta.is_delta_on_github(snapshot, github_file):
+        if delta.restore_delta(GITHUB_REPO, HEADERS, github_file, save_location):
+            print(f"Downloaded {github_file} to {save_location}")
+            return True
+        print(f"Error downloading {github_file}.")
+        return False
 
-    if response.status_code == 200:
-        with open(save_location, 'wb') as file:
-            file.write(response.content)
+    # Stream into a temporary file and only replace the local copy once the content matches GitHub's blob SHA
+    url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/{remote_snapshot.branch_name}/{github_file}"
+    expected_sha, expected_size = snapshot.get(github_file, (None, None))
+
+    if file_transfer.download_to_file(url, HEADERS, save_location, expected_sha, expected_size, decompress=True):
         print(f"Downloaded {github_file} to {save_location}")
         return True
     else:
-        print(f"Error downloading {github_file}: {response.status_code}")
+        print(f"Error downloading {github_file}.")
         return False
 
 
-# Function to upload a local file to GitHub
-def upload_to_github(local_file, github_file):
-    try:
-        # Read the local file content
-        with open(local_file, 'rb') as f:
-            content = f.read()
-
-        # Convert the content to Base64 encoding required by GitHub API
-        encoded_content = base64.b64encode(content).decode('utf-8')
-
-        # Check if the file exists on GitHub
-        url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{github_file}"
-        response = requests.get(url, headers=HEADERS)
-
-        if response.status_code == 200:
-            # File exists, get its SHA to update the file
-            file_info = response.json()
-            sha = file_info['sha']
-            message = f"Update {github_file} via script"
-            data = {
-                "message": message,
-                "content": encoded_content,
-                "sha": sha
-            }
-        elif response.status_code == 404:
-            # File doesn't exist, create a new one
-            message = f"Create {github_file} via script"
-            data = {
-                "message": message,
-                "content": encoded_content
-            }
-        else:
-            print(f"Error checking file existence on GitHub: {response.status_code}")
-            return False
+# Function to queue a local file for the next batched commit, stored the way its file options ask for
+def queue_file_upload(settings, local_file, github_file):
+    options = file_options.get_file_options(settings, github_file)
+    compression = options['compression'] if options['compression'] != 'none' else None
+    # A copy stored another way before the storage mode changed would be restored instead of this one
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS) or {}
+    if options['storage'] != 'chunked' and chunk_store.manifest_path(github_file) in snapshot:
+        batch_commit.queue_delete(chunk_store.manifest_path(github_file))
+    if options['storage'] != 'delta' and delta.manifest_path(github_file) in snapshot:
+        delta.queue_delete_stored(GITHUB_REPO, HEADERS, github_file)
 
-        # Send PUT request to create/update the file
-        response = requests.put(url, headers=HEADERS, json=data)
-        if response.status_code in [200, 201]:
-            print(f"Successfully uploaded {github_file} to GitHub.")
-            return True
-        else:
-            print(f"Error uploading file to GitHub: {response.status_code}")
-            return False
-
-    except Exception as e:
-        print(f"An error occurred while uploading the file: {e}")
-        return False
+    if options['storage'] == 'chunked':
+        return chunk_store.upload_chunked(GITHUB_REPO, HEADERS, local_file, github_file, compression)
+    if options['storage'] == 'delta':
+        return delta.upload_delta(GITHUB_REPO, HEADERS, local_file, github_file, compression)
+    batch_commit.queue_upload(local_file, github_file, compression)
+    return True
 
 
 def format_datetime(dt):
@@ -309,95 +375,201 @@ def format_datetime(dt):
     return local_dt.strftime('%d %B %Y @ %H:%M%p')  # Use %H for 24-hour format
 
 
-# Background file check function
-def check_files():
+# Function to check tracked files against GitHub (only the given GitHub paths if files_to_check is set)
+def run_file_check(settings, files_to_check=None):
+    hash_cache.reset_cache_stats()
+    github_client.reset_stats()
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS, refresh=True)
+    tracked = [(key, value, False) for key, value in settings['files_to_track'].items()]
+    # Tracked directories are expanded into the files they contain now, so new files are picked up
+    root_files = directory_walker.expand_tracked_roots(snapshot, skip=settings['files_to_track'])
+    tracked += [(key, value, True) for key, value in root_files.items()]
+    compare_mode = settings['compare_mode']
+    keys_to_remove = []  # List to collect keys to remove
+    uploads = []
+    downloads = []
+    workers = {**check_pipeline.default_workers, **settings['check_workers']}
+    with check_pipeline.CheckPipeline(workers) as pipeline:
+        # Hash and look up every file concurrently, each file moves on to the next stage as soon as
+        # its previous stage is done
+        checks = []
+        for key, value, from_root in tracked:
+            if files_to_check is not None and key not in files_to_check:
+                continue
+            hashed = pipeline.submit('hash', hash_tracked_file, key, value, compare_mode, from_root)
+            checks.append(pipeline.then(hashed, 'remote', fetch_remote_file_state, compare_mode))
+
+        # Show the results in tracking order and ask about any changed files
+        for check in checks:
+            item, output = check.result()
+            print(output, end='')
+            if item is None:
+                continue
+            action = choose_file_action(item, settings['show_console_if_input'])
+            if action == 'remove':
+                keys_to_remove.append(item['github_file'])
+                state_db.record_sync(item['github_file'], 'check', 'removed')
+            elif action == 'skip' and item.get('deleted'):
+                # Nothing is recorded, so the file's last outcome still shows it was synced here
+                continue
+            elif action == 'skip':
+                identical = 'github_hash' in item and item['local_hash'] == item['github_hash']
+                state_db.record_sync(item['github_file'], 'check', 'identical' if identical else 'skipped',
+                                     item.get('local_hash'), item.get('github_hash'))
+            elif action == 'upload':
+                # Queue the upload so every changed file goes up in one commit at the end of the check
+                if queue_file_upload(settings, item['local_file'], item['github_file']):
+                    print("Queued local version for upload to GitHub.")
+                    uploads.append(item)
+                else:
+                    state_db.record_sync(item['github_file'], 'upload', 'failed')
+            elif action == 'download':
+                print("Queued GitHub version for download.")
+                downloads.append((item, pipeline.submit('transfer', download_github_file,
+                                                        item['github_file'], item['local_file'])))
+
+        committed = set()
+        if batch_commit.has_pending_changes():
+            print("Uploading queued files to GitHub...")
+            committed = batch_commit.flush_pending_changes(GITHUB_REPO, HEADERS, workers=workers['transfer'])
+        for item in uploads:
+            github_file = item['github_file']
+            # Chunked and delta-stored files are committed as their manifest
+            stored = {github_file, chunk_store.manifest_path(github_file), delta.manifest_path(github_file)}
+            state_db.record_sync(github_file, 'upload', 'uploaded' if committed & stored else 'failed',
+                                 item['local_hash'])
+        for item, download in downloads:
+            downloaded, output = download.result()
+            print(output, end='')
+            state_db.record_sync(item['github_file'], 'download', 'downloaded' if downloaded else 'failed',
+                                 remote_hash=item.get('github_hash'))
+
+    # Now remove the collected keys after the iteration is done
+    for key in keys_to_remove:
+        del settings['files_to_track'][key]
+    save_settings(settings)  # Save settings after all removals
+    hash_cache.save_hash_cache()
+    github_client.save_response_cache()
+    file_compression.save_content_hashes()
+    print_and_log(hash_cache.cache_stats_message(), logging.info)
+    print_and_log(github_client.stats_message(), logging.info)
+
+
+# Function to tell the user a check is done and hide the console again
+def finish_check():
+    print("Check complete!")
+    print("Hiding the console until the next check.")
+    print("Console can be made visible via the system tray icon.")
+    time.sleep(5)
+    hide_console()
+
+
+# Scheduled job: check every tracked file, then schedule the next full check an interval later
+def full_check_job(reason="Checking for file changes..."):
     print()
-    global file_check_active, game_check_active, first_run_check
-    while True:
-        if not game_check_active:
-            file_check_active = True
-            print()
+    settings = None
+    try:
+        settings = load_settings(True)
+        console_print(reason, settings['show_console_if_input'])
+        # Every file is checked, which covers any changes still waiting for their own check
+        with pending_changes_lock:
+            pending_changes.clear()
+        # Check if files_to_track is empty
+        if not settings['files_to_track'] and not state_db.get_tracked_roots():
+            print("No files are currently being tracked.")
+        else:
+            run_file_check(settings)
+        update_watched_files(settings)
+        finish_check()
+    finally:
+        # The next check is scheduled even if this one failed, so one error doesn't stop the backups
+        first_check_done.set()
+        scheduler.schedule('full_check', full_check_job, delay=get_file_check_interval(settings) * 60,
+                           priority=job_scheduler.PRIORITY_FULL_CHECK)
+
+
+# Function to get the minutes between full checks, reading the settings again (or using the default) if they
+# couldn't be loaded for the check
+def get_file_check_interval(settings):
+    if settings is None:
+        try:
             settings = load_settings(True)
-            file_check_interval = settings['file_check_interval'] * 60
-            console_print("Checking for file changes...", settings['show_console_if_input'])
-            # Check if files_to_track is empty
-            if not settings['files_to_track']:
-                print("No files are currently being tracked.")
-            else:
-                keys_to_remove = []  # List to collect keys to remove
-                for key in list(settings['files_to_track'].keys()):  # Use list() to avoid modifying while iterating
-                    print()
-                    print(f"Checking file: {key}...")
-                    time.sleep(1)
-                    print()
-                    value = settings['files_to_track'][key]
-                    # If compare_files indicates removal
-                    if not compare_files(key, value, settings['show_console_if_input']):
-                        keys_to_remove.append(key)
-                # Now remove the collected keys after the iteration is done
-                for key in keys_to_remove:
-                    del settings['files_to_track'][key]
-                save_settings(settings)  # Save settings after all removals
-            print("Check complete!")
-            print("Hiding the console until the next check.")
-            print("Console can be made visible via the system tray icon.")
-            time.sleep(5)
-            file_check_active = False
-            hide_console()
-            if first_run_check:
-                first_run_check = False
-            time.sleep(file_check_interval)  # Sleep for the user-defined interval
+        except Exception as e:
+            logging.exception(f"Could not load the settings: {e}")
+            return settings_store.default_settings['file_check_interval']
+    return settings['file_check_interval']
+
+
+# Event job: check the watched files that changed since the last check
+def changed_files_job():
+    with pending_changes_lock:
+        files_to_check = list(pending_changes)
+        pending_changes.clear()
+    if not files_to_check:
+        return
+    settings = load_settings(True)
+    console_print(f"Detected changes in {len(files_to_check)} tracked file(s)...", settings['show_console_if_input'])
+    run_file_check(settings, files_to_check)
+    # Tracking may have changed during the check
+    update_watched_files(settings)
+    finish_check()
+
+
+# Function to get every local file to watch, tracked on its own or found in a tracked directory
+def get_watched_files(settings):
+    files = dict(settings['files_to_track'].items())
+    files.update(directory_walker.expand_tracked_roots(skip=files))
+    return files
+
+
+# Function to watch the tracked files for changes, or stop watching if the setting is off
+def update_watched_files(settings):
+    global watched_files
+    watched_files = get_watched_files(settings) if settings['watch_for_changes'] else {}
+    file_watcher.watch_files(watched_files.values())
+
+
+# Function to wait for watched files to change and queue a check of them. It sleeps until something changes, and
+# the check itself runs on the scheduler so it never overlaps another one.
+def watch_for_changes():
+    while True:
+        changed_paths = file_watcher.wait_for_changes(watch_timeout)
+        if not changed_paths:
+            continue
+        files_to_check = [key for key, value in watched_files.items()
+                          if file_watcher.normalise_path(value) in changed_paths]
+        if files_to_check:
+            with pending_changes_lock:
+                pending_changes.update(files_to_check)
+            scheduler.trigger('changed_files', changed_files_job, priority=job_scheduler.PRIORITY_CHANGED_FILES)
 
 
 # Function to monitor the game process
 def monitor_game_process():
-    while first_run_check:
-        time.sleep(5)
+    first_check_done.wait()
     print("File check finished. Starting process monitor...")
     print()
-    global file_check_active, game_check_active
-    global game_was_opened, game_check_notification
     print("Process monitor started...")
     while True:
-        if not file_check_active:
-            game_check_active = True
-            settings = load_settings(True)
-            game_check_interval = settings['game_check_interval'] * 60
-            console_print("Starting process watchlist check...", settings['show_console_if_input'])
-            if not settings['process_watchlist']:
-                print("No processes are in the watchlist")
-            else:
-                for process_name in settings['process_watchlist']:
-                    print()
-                    print(f"Checking if {process_name} is currently running.")
-                    # Check if the process is running
-                    game_running = any(process.name() == process_name for process in psutil.process_iter())
-                    if game_running:
-                        if not game_was_opened:
-                            print(f"{process_name} has been opened.")
-                            game_was_opened = True  # Mark that the game was opened
-                        else:
-                            print(f"{process_name} is running.")
-                            game_was_opened = True
-                    else:
-                        if game_was_opened:
-                            print(f"{process_name} has been closed, starting backup.")
-                            check_files()
-                            game_was_opened = False  # Reset the flag since the game has closed
-                        else:
-                            print(f"{process_name} is not running.")
-            print()
-            print("Check complete!")
-            print("Hiding the console until the next check.")
-            print("Console can be made visible via the system tray icon.")
-            time.sleep(5)
-            game_check_active = False
-            hide_console()
-            time.sleep(game_check_interval)  # Check every 5 seconds
+        settings = load_settings(True)
+        if settings['process_watchlist']:
+            # One snapshot of the process table per tick, each watchlist entry keeps its own open/closed state
+            events, _ = process_monitor.poll_watchlist(settings['process_watchlist'])
+            for process_name, event in events:
+                if event == 'opened':
+                    print_and_log(f"{process_name} has been opened.", logging.info)
+                else:
+                    console_print(f"{process_name} has been closed, starting backup.",
+                                  settings['show_console_if_input'])
+                    # Runs ahead of any other waiting check, several processes closing at once back up once
+                    scheduler.trigger('process_closed', full_check_job, f"Backing up after {process_name} closed...",
+                                      priority=job_scheduler.PRIORITY_PROCESS_CLOSED)
+        time.sleep(settings['process_check_interval'])
 
 
 # Function to handle system tray quit
 def quit_action(icon):
+    scheduler.stop()
     icon.stop()
 
 
@@ -451,9 +623,13 @@ def start_background_tasks():
     print("Hide this console via the System Tray (Bottom Right)\n"
           "It will open itself again when needed!")
 
-    # Start the file check thread
-    file_check_thread = threading.Thread(target=check_files, daemon=True)
-    file_check_thread.start()
+    # Start running checks, beginning with a full one
+    scheduler.start()
+    scheduler.trigger('full_check', full_check_job, priority=job_scheduler.PRIORITY_FULL_CHECK)
+
+    # Start the thread that queues checks of files as they change
+    watcher_thread = threading.Thread(target=watch_for_changes, daemon=True)
+    watcher_thread.start()
 
     # Start the game monitoring thread
     game_monitor_thread = threading.Thread(target=monitor_game_process, daemon=True)
@@ -0,0 +1,210 @@
+import base64
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import file_compression
+import file_transfer
+import github_client
+import remote_snapshot
+
+# Variable Declaration
+max_commit_retries = 5
+
+_pending_uploads = {}  # github path -> (local file, compression algorithm or None)
+_pending_blobs = {}  # github path -> (blob sha, size) for blobs that were already created
+_pending_deletes = set()
+_pending_lock = threading.Lock()
+
+
+# Function to queue a local file to be uploaded in the next batched commit, compressed if an algorithm is given
+def queue_upload(local_file, github_file, compression=None):
+    with _pending_lock:
+        _pending_deletes.discard(github_file)
+        _pending_blobs.pop(github_file, None)
+        _pending_uploads[github_file] = (local_file, compression)
+
+
+# Function to queue a blob that was already created on GitHub to be added in the next batched commit
+def queue_blob(github_file, sha, size):
+    with _pending_lock:
+        _pending_deletes.discard(github_file)
+        _pending_uploads.pop(github_file, None)
+        _pending_blobs[github_file] = (sha, size)
+
+
+# Function to queue a GitHub file to be deleted in the next batched commit
+def queue_delete(github_file):
+    with _pending_lock:
+        _pending_uploads.pop(github_file, None)
+        _pending_blobs.pop(github_file, None)
+        _pending_deletes.add(github_file)
+
+
+# Function to check if anything is waiting to be committed
+def has_pending_changes():
+    with _pending_lock:
+        return bool(_pending_uploads or _pending_blobs or _pending_deletes)
+
+
+# Function to upload a local file as a git blob (compressed if an algorithm is given), returning its SHA and
+# stored size
+def create_blob(repo, headers, local_file, compression=None):
+    upload_file = local_file
+    content_hash = None
+    if compression is not None:
+        # Files that look already compressed, or don't shrink, are uploaded as they are
+        compressed = file_compression.compress_file(local_file, compression)
+        if compressed is not None:
+            upload_file, content_hash = compressed
+    try:
+        # The content is read and Base64 encoded as it is sent, so memory use doesn't grow with the file size
+        body = file_transfer.Base64JsonBody(upload_file, {"encoding": "base64"})
+        url = f"https://api.github.com/repos/{repo}/git/blobs"
+        start = time.monotonic()
+        response = github_client.post(url, headers={**headers, 'Content-Type': 'application/json'}, data=body)
+        if response.status_code == 201:
+            sha = response.json()['sha']
+            throughput = file_transfer.throughput_message(body.size, time.monotonic() - start)
+            if content_hash is not None:
+                # Remember what the compressed blob holds, so it can be compared without downloading it
+                file_compression.remember_content_hash(sha, content_hash)
+                print(f"Uploaded {local_file} compressed to {body.size / max(os.path.getsize(local_file), 1):.0%} "
+                      f"({throughput}).")
+            else:
+                print(f"Uploaded {local_file} ({throughput}).")
+            return sha, body.size
+        print(f"Error uploading {local_file} to GitHub: {response.status_code}")
+        return None, None
+    finally:
+        if upload_file != local_file:
+            os.remove(upload_file)
+
+
+# Function to upload content that is already in memory as a git blob, returning its SHA
+def create_blob_from_bytes(repo, headers, content):
+    data = {
+        "content": base64.b64encode(content).decode('utf-8'),
+        "encoding": "base64"
+    }
+    url = f"https://api.github.com/repos/{repo}/git/blobs"
+    response = github_client.post(url, headers=headers, json=data)
+    if response.status_code == 201:
+        return response.json()['sha']
+    print(f"Error uploading content to GitHub: {response.status_code}")
+    return None
+
+
+# Function to create a blob, reporting read errors instead of raising them
+def _create_blob_safely(repo, headers, local_file, compression=None):
+    try:
+        return create_blob(repo, headers, local_file, compression)
+    except OSError as e:
+        print(f"An error occurred while uploading {local_file}: {e}")
+        return None, None
+
+
+# Function to get the current head commit and its tree
+def _get_head(repo, headers):
+    branch = remote_snapshot.branch_name
+    url = f"https://api.github.com/repos/{repo}/git/ref/heads/{branch}"
+    response = github_client.get(url, headers=headers)
+    if response.status_code != 200:
+        print(f"Error fetching the head of '{branch}': {response.status_code}")
+        return None, None
+    head_sha = response.json()['object']['sha']
+
+    url = f"https://api.github.com/repos/{repo}/git/commits/{head_sha}"
+    response = github_client.get(url, headers=headers)
+    if response.status_code != 200:
+        print(f"Error fetching commit {head_sha}: {response.status_code}")
+        return None, None
+    return head_sha, response.json()['tree']['sha']
+
+
+# Function to build one tree and commit on top of the head, then move the branch to it
+def _commit_tree(repo, headers, tree_entries, message):
+    for attempt in range(max_commit_retries):
+        head_sha, base_tree_sha = _get_head(repo, headers)
+        if head_sha is None:
+            return False
+
+        url = f"https://api.github.com/repos/{repo}/git/trees"
+        response = github_client.post(url, headers=headers, json={"base_tree": base_tree_sha, "tree": tree_entries})
+        if response.status_code != 201:
+            print(f"Error creating tree on GitHub: {response.status_code}")
+            return False
+        tree_sha = response.json()['sha']
+
+        url = f"https://api.github.com/repos/{repo}/git/commits"
+        data = {"message": message, "tree": tree_sha, "parents": [head_sha]}
+        response = github_client.post(url, headers=headers, json=data)
+        if response.status_code != 201:
+            print(f"Error creating commit on GitHub: {response.status_code}")
+            return False
+        commit_sha = response.json()['sha']
+
+        branch = remote_snapshot.branch_name
+        url = f"https://api.github.com/repos/{repo}/git/refs/heads/{branch}"
+        response = github_client.patch(url, headers=headers, json={"sha": commit_sha, "force": False})
+        if response.status_code == 200:
+            return True
+        if response.status_code == 422:
+            # Someone else pushed in the meantime, so rebuild the tree on the new head and try again
+            print(f"GitHub branch moved during commit, retrying... ({attempt + 1}/{max_commit_retries})")
+            time.sleep(attempt + 1)
+            continue
+        print(f"Error updating branch '{branch}' on GitHub: {response.status_code}")
+        return False
+
+    print("Error: Could not commit changes, the branch kept moving.")
+    return False
+
+
+# Function to commit every queued upload and deletion to GitHub in a single commit
+def flush_pending_changes(repo, headers, message=None, workers=1):
+    with _pending_lock:
+        uploads = dict(_pending_uploads)
+        created_blobs = dict(_pending_blobs)
+        deletes = set(_pending_deletes)
+        _pending_uploads.clear()
+        _pending_blobs.clear()
+        _pending_deletes.clear()
+    if not uploads and not created_blobs and not deletes:
+        return set()
+
+    # Upload the content of each file as a blob, these are reused if the commit has to be retried
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        blobs = executor.map(lambda upload: _create_blob_safely(repo, headers, *upload), uploads.values())
+        blobs = list(blobs)
+
+    tree_entries = []
+    uploaded = {}
+    for github_file, (sha, size) in list(zip(uploads, blobs)) + list(created_blobs.items()):
+        if sha is not None:
+            tree_entries.append({"path": github_file, "mode": "100644", "type": "blob", "sha": sha})
+            uploaded[github_file] = (sha, size)
+
+    snapshot = remote_snapshot.get_remote_snapshot(repo, headers) or {}
+    # Deleting a path that doesn't exist makes GitHub reject the whole tree
+    deleted = {github_file for github_file in deletes if github_file in snapshot}
+    for github_file in deleted:
+        tree_entries.append({"path": github_file, "mode": "100644", "type": "blob", "sha": None})
+
+    if not tree_entries:
+        return set()
+
+    if message is None:
+        message = f"Update {len(uploaded)} and delete {len(deleted)} file(s) via script"
+    message += "\n\n" + "\n".join(sorted(uploaded) + [f"Deleted {github_file}" for github_file in sorted(deleted)])
+
+    if not _commit_tree(repo, headers, tree_entries, message):
+        return set()
+
+    for github_file, (sha, size) in uploaded.items():
+        remote_snapshot.update_remote_snapshot(github_file, sha, size)
+    for github_file in deleted:
+        remote_snapshot.remove_from_remote_snapshot(github_file)
+    print(f"Committed {len(uploaded)} upload(s) and {len(deleted)} deletion(s) to GitHub in one commit.")
+    return set(uploaded) | deleted
@@ -0,0 +1,89 @@
+import io
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Variable Declaration
+default_workers = {"hash": 4, "remote": 8, "transfer": 4}
+
+_thread_output = threading.local()
+
+
+# Sends print output from pipeline workers to a buffer for their current task, so it can be shown in order
+class _ThreadOutputRouter:
+    def __init__(self, console):
+        self.console = console
+
+    def write(self, text):
+        buffer = getattr(_thread_output, 'buffer', None)
+        return (buffer if buffer is not None else self.console).write(text)
+
+    def flush(self):
+        self.console.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.console, name)
+
+
+# Function to route worker output through per-task buffers (the main thread still prints straight away)
+def install_output_router():
+    if not isinstance(sys.stdout, _ThreadOutputRouter):
+        sys.stdout = _ThreadOutputRouter(sys.stdout)
+
+
+# Function to run a stage function while capturing everything it prints
+def _run_captured(func, *args):
+    buffer = io.StringIO()
+    _thread_output.buffer = buffer
+    try:
+        result = func(*args)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        result = None
+    finally:
+        _thread_output.buffer = None
+    return result, buffer.getvalue()
+
+
+# Runs the stages of a check cycle on separate bounded thread pools
+class CheckPipeline:
+    def __init__(self, workers=None):
+        install_output_router()
+        workers = {**default_workers, **(workers or {})}
+        self.pools = {stage: ThreadPoolExecutor(max_workers=max(1, int(count)), thread_name_prefix=f"check-{stage}")
+                      for stage, count in workers.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    # Function to run func(*args) on a stage's pool, the future resolves to (result, captured output)
+    def submit(self, stage, func, *args):
+        return self.pools[stage].submit(_run_captured, func, *args)
+
+    # Function to run func(previous result, *args) on a stage's pool once the previous stage finished
+    def then(self, previous, stage, func, *args):
+        chained = Future()
+
+        def start_next(done):
+            result, output = done.result()
+            if result is None:
+                # The previous stage failed, so pass its output along without running this one
+                chained.set_result((None, output))
+                return
+
+            def finish(next_done):
+                next_result, next_output = next_done.result()
+                chained.set_result((next_result, output + next_output))
+
+            self.submit(stage, func, result, *args).add_done_callback(finish)
+
+        previous.add_done_callback(start_next)
+        return chained
+
+    # Function to wait for every stage to finish, in pipeline order
+    def shutdown(self):
+        for pool in self.pools.values():
+            pool.shutdown(wait=True)
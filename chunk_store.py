@@ -0,0 +1,282 @@
+import base64
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+
+import batch_commit
+import file_compression
+import file_transfer
+import github_client
+import hash_cache
+import remote_snapshot
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # numpy is optional, boundaries are searched for byte by byte when it isn't installed
+
+# Variable Declaration
+chunk_folder = ".chunks"
+manifest_suffix = ".chunks.json"
+manifest_version = 1
+min_chunk_size = 256 * 1024  # bytes, no boundary is looked for before this
+average_chunk_bits = 20  # a boundary is found every 2^20 bytes (1 MB) on average
+max_chunk_size = 4 * 1024 * 1024  # bytes, a chunk is cut here if no boundary was found
+read_size = max_chunk_size
+boundary_block_size = 256 * 1024  # bytes hashed at a time when numpy is used
+
+# The gear table has to be the same on every machine and every version, so it comes from a fixed seed
+_gear = [random.Random(0x5EED ^ byte).getrandbits(64) for byte in range(256)]
+_boundary_mask = (1 << average_chunk_bits) - 1
+# Only the low bits of the hash decide a boundary, and carries only move upwards, so only the low bits of the table
+# are needed. They also mean the hash at a byte depends on just the average_chunk_bits bytes before it.
+_gear_low = [gear & _boundary_mask for gear in _gear]
+_gear_low_array = numpy.array(_gear_low, dtype=numpy.uint32) if numpy is not None else None
+
+
+# Function to get the path of the manifest that lists a chunked file's chunks
+def manifest_path(github_file):
+    return github_file + manifest_suffix
+
+
+# Function to get the path a chunk is stored at, fanned out by the first byte of its hash
+def chunk_path(chunk_hash):
+    return f"{chunk_folder}/{chunk_hash[:2]}/{chunk_hash}"
+
+
+# Function to get the tracked file a GitHub path stands for (manifests stand for their chunked file)
+def logical_path(github_path):
+    if github_path.endswith(manifest_suffix):
+        return github_path[:-len(manifest_suffix)]
+    return github_path
+
+
+# Function to check if a file is stored in chunks on GitHub
+def is_chunked_on_github(snapshot, github_file):
+    return github_file not in snapshot and manifest_path(github_file) in snapshot
+
+
+# Function to find the first boundary between start and limit with numpy, hashing a block at a time. The hash at
+# each byte is worked out for the whole block at once as the sum of the table values of the bytes before it, each
+# shifted by how far back it is.
+def _find_boundary_numpy(data, start, limit):
+    for block_start in range(start, limit, boundary_block_size):
+        block_end = min(block_start + boundary_block_size, limit)
+        # The bytes just before the block are hashed too, the hash only starts from nothing at start
+        context_start = max(start, block_start - average_chunk_bits + 1)
+        values = _gear_low_array[numpy.frombuffer(data, numpy.uint8, block_end - context_start, context_start)]
+        hashes = values.copy()
+        for shift in range(1, average_chunk_bits):
+            hashes[shift:] += values[:-shift] << shift
+        hashes &= _boundary_mask
+        boundaries = numpy.flatnonzero(hashes[block_start - context_start:] == 0)
+        if boundaries.size:
+            return block_start + int(boundaries[0]) + 1
+    return limit
+
+
+# Function to find where the next chunk ends, using a gear rolling hash so boundaries depend on the content around
+# them rather than their offset (an insert near the start of a file only changes the chunks around it)
+def _find_boundary(data, length):
+    limit = min(length, max_chunk_size)
+    if limit <= min_chunk_size:
+        return limit
+    if numpy is not None:
+        return _find_boundary_numpy(data, min_chunk_size, limit)
+    gear = _gear_low
+    mask = _boundary_mask
+    rolling_hash = 0
+    for index, byte in enumerate(memoryview(data)[min_chunk_size:limit], min_chunk_size + 1):
+        rolling_hash = ((rolling_hash << 1) + gear[byte]) & mask
+        if not rolling_hash:
+            return index
+    return limit
+
+
+# Function to split an open file into content-defined chunks
+def iter_chunks(f):
+    buffer = b""
+    eof = False
+    while True:
+        # Always have a full chunk's worth buffered (unless the file ends), so boundaries don't depend on reads
+        while not eof and len(buffer) < max_chunk_size:
+            block = f.read(read_size)
+            if not block:
+                eof = True
+            buffer += block
+        if not buffer:
+            return
+        cut = _find_boundary(buffer, len(buffer))
+        yield buffer[:cut]
+        buffer = buffer[cut:]
+
+
+# Function to get the manifest of a chunked file from GitHub
+def fetch_manifest(repo, headers, github_file):
+    url = f"https://api.github.com/repos/{repo}/contents/{manifest_path(github_file)}"
+    response = github_client.get(url, headers=headers)
+    if response.status_code != 200:
+        print(f"Error fetching the chunk manifest of {github_file}: {response.status_code}")
+        return None
+    try:
+        manifest = json.loads(base64.b64decode(response.json()['content']).decode('utf-8'))
+    except (KeyError, ValueError):
+        print(f"The chunk manifest of {github_file} could not be read.")
+        return None
+    if manifest.get('version') != manifest_version:
+        print(f"The chunk manifest of {github_file} is from an unsupported version.")
+        return None
+    return manifest
+
+
+# Function to upload a file in chunks, creating blobs only for chunks GitHub doesn't already have. The chunks and
+# the manifest are queued to be committed with the next batched commit. Chunks are named by the hash of their
+# uncompressed content, so compressing them doesn't stop them being shared.
+def upload_chunked(repo, headers, local_file, github_file, compression=None):
+    snapshot = remote_snapshot.get_remote_snapshot(repo, headers)
+    if snapshot is None:
+        print(f"Could not list the files on GitHub, {github_file} was not uploaded.")
+        return False
+
+    start = time.monotonic()
+    chunks = []
+    new_chunks = {}
+    file_hasher = hashlib.sha256()
+    size = 0
+    uploaded_bytes = 0
+    with open(local_file, 'rb') as f:
+        for chunk in iter_chunks(f):
+            chunk_hash = hashlib.sha256(chunk).hexdigest()
+            file_hasher.update(chunk)
+            size += len(chunk)
+            chunks.append([chunk_hash, len(chunk)])
+            path = chunk_path(chunk_hash)
+            if path in snapshot or path in new_chunks:
+                continue
+            stored = chunk if compression is None else file_compression.compress_bytes(chunk, compression)
+            sha = batch_commit.create_blob_from_bytes(repo, headers, stored)
+            if sha is None:
+                return False
+            new_chunks[path] = (sha, len(stored))
+            uploaded_bytes += len(stored)
+
+    manifest = {
+        "version": manifest_version,
+        "size": size,
+        "sha256": file_hasher.hexdigest(),
+        "chunks": chunks
+    }
+    manifest_content = json.dumps(manifest, indent=1).encode('utf-8')
+    manifest_sha = batch_commit.create_blob_from_bytes(repo, headers, manifest_content)
+    if manifest_sha is None:
+        return False
+
+    for path, (sha, chunk_size) in new_chunks.items():
+        batch_commit.queue_blob(path, sha, chunk_size)
+    batch_commit.queue_blob(manifest_path(github_file), manifest_sha, len(manifest_content))
+    # A plain copy from before the file was chunked would shadow the manifest
+    if github_file in snapshot:
+        batch_commit.queue_delete(github_file)
+
+    print(f"Chunked {github_file} into {len(chunks)} chunk(s), {len(new_chunks)} new: uploaded "
+          f"{file_transfer.throughput_message(uploaded_bytes, time.monotonic() - start)}.")
+    return True
+
+
+# Function to index the chunks of a local file by hash, so chunks that didn't change aren't downloaded again
+def _index_local_chunks(local_file):
+    local_chunks = {}
+    if not os.path.exists(local_file):
+        return local_chunks
+    offset = 0
+    with open(local_file, 'rb') as f:
+        for chunk in iter_chunks(f):
+            local_chunks.setdefault(hashlib.sha256(chunk).hexdigest(), (offset, len(chunk)))
+            offset += len(chunk)
+    return local_chunks
+
+
+# Function to download a chunk and check it matches its hash
+def _download_chunk(repo, headers, chunk_hash):
+    url = f"https://raw.githubusercontent.com/{repo}/{remote_snapshot.branch_name}/{chunk_path(chunk_hash)}"
+    response = github_client.get(url, headers=headers)
+    if response.status_code != 200:
+        print(f"Error downloading chunk {chunk_hash}: {response.status_code}")
+        return None
+    try:
+        chunk = file_compression.decompress_bytes(response.content)
+    except ValueError as e:
+        print(f"Downloaded chunk {chunk_hash} could not be decompressed: {e}")
+        return None
+    if hashlib.sha256(chunk).hexdigest() != chunk_hash:
+        print(f"Downloaded chunk {chunk_hash} does not match its hash.")
+        return None
+    return chunk
+
+
+# Function to rebuild a chunked file from its manifest, replacing the local file only once it is complete and
+# verified. Chunks the local file already has are copied from it instead of being downloaded.
+def restore_chunked(repo, headers, github_file, save_location):
+    manifest = fetch_manifest(repo, headers, github_file)
+    if manifest is None:
+        return False
+
+    # A local copy that already matches doesn't need splitting into chunks, let alone restoring
+    if os.path.exists(save_location) and hash_cache.get_file_hash(save_location) == manifest['sha256']:
+        print(f"{save_location} already matches {github_file}.")
+        return True
+
+    start = time.monotonic()
+    local_chunks = _index_local_chunks(save_location)
+    directory = os.path.dirname(os.path.abspath(save_location))
+    temp_fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(save_location)}.",
+                                          suffix=".part")
+    try:
+        file_hasher = hashlib.sha256()
+        downloaded_bytes = 0
+        failed = False
+        with os.fdopen(temp_fd, 'wb') as temp_file:
+            local = open(save_location, 'rb') if local_chunks else None
+            try:
+                for chunk_hash, chunk_size in manifest['chunks']:
+                    if chunk_hash in local_chunks:
+                        offset, _ = local_chunks[chunk_hash]
+                        local.seek(offset)
+                        chunk = local.read(chunk_size)
+                    else:
+                        chunk = _download_chunk(repo, headers, chunk_hash)
+                        if chunk is None:
+                            failed = True
+                            break
+                        downloaded_bytes += chunk_size
+                    temp_file.write(chunk)
+                    file_hasher.update(chunk)
+            finally:
+                if local is not None:
+                    local.close()
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+
+        # The temp file is only removed once it is closed, Windows can't remove a file that is still open
+        if failed:
+            os.remove(temp_path)
+            return False
+
+        if file_hasher.hexdigest() != manifest['sha256']:
+            print(f"Restored content of {github_file} does not match its manifest.")
+            os.remove(temp_path)
+            return False
+
+        os.replace(temp_path, save_location)
+        file_transfer.fsync_directory(directory)
+        hash_cache.invalidate_file_hash(save_location)
+        print(f"Restored {github_file} from {len(manifest['chunks'])} chunk(s), downloaded "
+              f"{file_transfer.throughput_message(downloaded_bytes, time.monotonic() - start)}.")
+        return True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
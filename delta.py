@@ -0,0 +1,239 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import batch_commit
+import delta_patch
+import file_transfer
+import github_client
+import hash_cache
+import remote_snapshot
+
+# Variable Declaration
+delta_folder = ".deltas"
+manifest_suffix = ".delta.json"
+manifest_version = 1
+signature_folder = 'delta_signatures'
+compact_after = 10  # patches, the next upload after this many stores a new full base instead
+max_patch_ratio = 0.5  # store a new base instead if a patch would be bigger than this share of the file
+
+
+# Function to get the path of the manifest that lists a delta-stored file's base and patches
+def manifest_path(github_file):
+    return github_file + manifest_suffix
+
+
+# Function to get the tracked file a GitHub path stands for (manifests stand for their delta-stored file)
+def logical_path(github_path):
+    if github_path.endswith(manifest_suffix):
+        return github_path[:-len(manifest_suffix)]
+    return github_path
+
+
+# Function to check if a file is stored as a base and patches on GitHub
+def is_delta_on_github(snapshot, github_file):
+    return github_file not in snapshot and manifest_path(github_file) in snapshot
+
+
+# Function to get where the signature of a tracked file's last synced version is kept
+def _signature_file(github_file):
+    return os.path.join(signature_folder, hashlib.sha1(github_file.encode('utf-8')).hexdigest() + ".json")
+
+
+# Function to load the signature of a tracked file's last synced version, or None if there isn't one
+def load_signature(github_file):
+    try:
+        with open(_signature_file(github_file), 'r') as f:
+            signature = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return signature if signature.get('github_file') == github_file else None
+
+
+# Function to save the signature of the version of a tracked file that was just synced
+def save_signature(local_file, github_file):
+    signature = delta_patch.compute_signature(local_file, github_file)
+    os.makedirs(signature_folder, exist_ok=True)
+    temp_file = _signature_file(github_file) + ".tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(signature, f)
+    os.replace(temp_file, _signature_file(github_file))
+    return signature
+
+
+# Function to get the manifest of a delta-stored file from GitHub
+def fetch_manifest(repo, headers, github_file):
+    url = f"https://api.github.com/repos/{repo}/contents/{manifest_path(github_file)}"
+    response = github_client.get(url, headers=headers)
+    if response.status_code != 200:
+        print(f"Error fetching the delta manifest of {github_file}: {response.status_code}")
+        return None
+    try:
+        manifest = json.loads(base64.b64decode(response.json()['content']).decode('utf-8'))
+    except (KeyError, ValueError):
+        print(f"The delta manifest of {github_file} could not be read.")
+        return None
+    if manifest.get('version') != manifest_version:
+        print(f"The delta manifest of {github_file} is from an unsupported version.")
+        return None
+    return manifest
+
+
+# Function to get the paths of every blob a manifest uses
+def manifest_blobs(manifest):
+    return [manifest['base']['path']] + [patch['path'] for patch in manifest['patches']]
+
+
+# Function to upload a new version of a file as a patch against the last synced version, or as a new full base
+# when there is no usable signature, the chain is long enough to compact, or most of the file changed. The blobs
+# and manifest are queued to be committed with the next batched commit.
+def upload_delta(repo, headers, local_file, github_file, compression=None):
+    snapshot = remote_snapshot.get_remote_snapshot(repo, headers)
+    if snapshot is None:
+        print(f"Could not list the files on GitHub, {github_file} was not uploaded.")
+        return False
+    manifest = None
+    if is_delta_on_github(snapshot, github_file):
+        manifest = fetch_manifest(repo, headers, github_file)
+        if manifest is None:
+            return False
+
+    start = time.monotonic()
+    signature = load_signature(github_file)
+    size = os.path.getsize(local_file)
+    patch_path = None
+    if (manifest is not None and signature is not None and signature['sha256'] == manifest['sha256'] and
+            len(manifest['patches']) < compact_after):
+        temp_fd, patch_path = tempfile.mkstemp(suffix=".fbd")
+        os.close(temp_fd)
+
+    try:
+        if patch_path is not None:
+            result_sha, result_size = delta_patch.write_delta(signature, local_file, patch_path)
+            if os.path.getsize(patch_path) > size * max_patch_ratio:
+                print(f"Most of {github_file} changed, storing a new base instead of a patch.")
+                os.remove(patch_path)
+                patch_path = None
+
+        old_blobs = []
+        if patch_path is not None:
+            name = f"{delta_folder}/{github_file}/patch-{len(manifest['patches']) + 1}-{result_sha[:16]}"
+            sha, stored_size = batch_commit.create_blob(repo, headers, patch_path, compression)
+            if sha is None:
+                return False
+            manifest['patches'].append({"path": name, "from": manifest['sha256'], "sha256": result_sha,
+                                        "size": result_size})
+            print(f"Stored {github_file} as patch {len(manifest['patches'])} against its last synced version.")
+        else:
+            result_sha = hash_cache.get_file_hash(local_file)
+            result_size = size
+            name = f"{delta_folder}/{github_file}/base-{result_sha[:16]}"
+            sha, stored_size = batch_commit.create_blob(repo, headers, local_file, compression)
+            if sha is None:
+                return False
+            if manifest is not None:
+                old_blobs = [path for path in manifest_blobs(manifest) if path != name]
+            manifest = {"version": manifest_version, "base": {"path": name, "sha256": result_sha, "size": size},
+                        "patches": []}
+            print(f"Stored {github_file} as a new full base.")
+    finally:
+        if patch_path is not None and os.path.exists(patch_path):
+            os.remove(patch_path)
+
+    manifest['sha256'] = result_sha
+    manifest['size'] = result_size
+    manifest_content = json.dumps(manifest, indent=1).encode('utf-8')
+    manifest_sha = batch_commit.create_blob_from_bytes(repo, headers, manifest_content)
+    if manifest_sha is None:
+        return False
+
+    batch_commit.queue_blob(name, sha, stored_size)
+    batch_commit.queue_blob(manifest_path(github_file), manifest_sha, len(manifest_content))
+    for path in old_blobs:
+        batch_commit.queue_delete(path)
+    # A plain copy from before the file used deltas would shadow the manifest
+    if github_file in snapshot:
+        batch_commit.queue_delete(github_file)
+
+    # The next patch is made against this version, if the commit fails the signature won't match the manifest
+    # and a full base is stored instead
+    save_signature(local_file, github_file)
+    print(f"Uploaded {github_file}: {file_transfer.throughput_message(stored_size, time.monotonic() - start)}.")
+    return True
+
+
+# Function to download one of a delta-stored file's blobs into a temporary file next to save_location
+def _download_blob(repo, headers, snapshot, path, directory):
+    temp_fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    os.close(temp_fd)
+    url = f"https://raw.githubusercontent.com/{repo}/{remote_snapshot.branch_name}/{path}"
+    expected_sha, expected_size = snapshot.get(path, (None, None))
+    if not file_transfer.download_to_file(url, headers, temp_path, expected_sha, expected_size, decompress=True):
+        os.remove(temp_path)
+        return None
+    return temp_path
+
+
+# Function to rebuild a delta-stored file. If the local file is a version in the chain only the later patches
+# are downloaded, otherwise the base is downloaded and every patch applied. The local file is only replaced once
+# the result matches the manifest.
+def restore_delta(repo, headers, github_file, save_location):
+    snapshot = remote_snapshot.get_remote_snapshot(repo, headers)
+    manifest = fetch_manifest(repo, headers, github_file) if snapshot is not None else None
+    if manifest is None:
+        return False
+
+    start = time.monotonic()
+    directory = os.path.dirname(os.path.abspath(save_location))
+    versions = [manifest['base']['sha256']] + [patch['sha256'] for patch in manifest['patches']]
+    local_sha = hash_cache.get_file_hash(save_location) if os.path.exists(save_location) else None
+    temp_files = []
+    try:
+        if local_sha in versions:
+            current = save_location
+            first_patch = len(versions) - 1 - versions[::-1].index(local_sha)
+        else:
+            current = _download_blob(repo, headers, snapshot, manifest['base']['path'], directory)
+            if current is None:
+                return False
+            temp_files.append(current)
+            first_patch = 0
+
+        for patch in manifest['patches'][first_patch:]:
+            patch_file = _download_blob(repo, headers, snapshot, patch['path'], directory)
+            if patch_file is None:
+                return False
+            temp_files.append(patch_file)
+            temp_fd, output_file = tempfile.mkstemp(dir=directory, suffix=".part")
+            os.close(temp_fd)
+            temp_files.append(output_file)
+            if not delta_patch.apply_delta(current, patch_file, output_file):
+                print(f"Applying {patch['path']} did not give the expected content.")
+                return False
+            current = output_file
+
+        if current != save_location:
+            os.replace(current, save_location)
+            file_transfer.fsync_directory(directory)
+        hash_cache.invalidate_file_hash(save_location)
+        save_signature(save_location, github_file)
+        applied = len(manifest['patches']) - first_patch
+        print(f"Restored {github_file} by applying {applied} patch(es) "
+              f"in {time.monotonic() - start:.1f}s.")
+        return True
+    finally:
+        for temp_file in temp_files:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+
+# Function to queue a delta-stored file's manifest, base and patches to be deleted in the next batched commit
+def queue_delete_stored(repo, headers, github_file):
+    manifest = fetch_manifest(repo, headers, github_file)
+    if manifest is not None:
+        for path in manifest_blobs(manifest):
+            batch_commit.queue_delete(path)
+    batch_commit.queue_delete(manifest_path(github_file))
@@ -0,0 +1,237 @@
+import hashlib
+import math
+import os
+import struct
+import zlib
+
+# Variable Declaration
+min_block_size = 4 * 1024
+max_block_size = 128 * 1024
+read_size = 8 * 1024 * 1024
+literal_flush_size = 1024 * 1024  # bytes of new data held before they are written to the patch
+
+ADLER_MOD = 65521
+PATCH_MAGIC = b'FBD1'
+PATCH_HEADER = struct.Struct('>4sI32s32sQ')  # magic, block size, base SHA-256, result SHA-256, result size
+COPY_OP = struct.Struct('>cII')  # b'C', first block, block count
+DATA_OP = struct.Struct('>cI')  # b'D', length (followed by the data)
+
+
+# Function to pick a block size, about the square root of the file size like rsync
+def _choose_block_size(size):
+    block_size = 1 << max(0, math.isqrt(size)).bit_length()
+    return max(min_block_size, min(max_block_size, block_size))
+
+
+def _strong_hash(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+# Function to build the signature of a file: a weak (adler32) and strong checksum for every block
+def compute_signature(local_file, github_file):
+    size = os.path.getsize(local_file)
+    block_size = _choose_block_size(size)
+    weak = []
+    strong = []
+    tail = None
+    file_hasher = hashlib.sha256()
+    with open(local_file, 'rb') as f:
+        while block := f.read(block_size):
+            file_hasher.update(block)
+            if len(block) < block_size:
+                tail = [len(block), _strong_hash(block).hex()]
+                break
+            weak.append(zlib.adler32(block))
+            strong.append(_strong_hash(block).hex())
+    return {
+        "github_file": github_file,
+        "block_size": block_size,
+        "size": size,
+        "sha256": file_hasher.hexdigest(),
+        "weak": weak,
+        "strong": strong,
+        "tail": tail
+    }
+
+
+# Writes the operations of a patch, merging copies of consecutive blocks into one
+class _PatchWriter:
+    def __init__(self, f):
+        self.f = f
+        self.copy_start = None
+        self.copy_count = 0
+        self.literal = bytearray()
+
+    def copy(self, block):
+        self.flush_literal()
+        if self.copy_start is not None and block == self.copy_start + self.copy_count:
+            self.copy_count += 1
+            return
+        self.flush_copy()
+        self.copy_start = block
+        self.copy_count = 1
+
+    def data(self, data):
+        self.flush_copy()
+        self.literal += data
+        if len(self.literal) >= literal_flush_size:
+            self.flush_literal()
+
+    def flush_copy(self):
+        if self.copy_start is not None:
+            self.f.write(COPY_OP.pack(b'C', self.copy_start, self.copy_count))
+            self.copy_start = None
+
+    def flush_literal(self):
+        if self.literal:
+            self.f.write(DATA_OP.pack(b'D', len(self.literal)))
+            self.f.write(self.literal)
+            self.literal = bytearray()
+
+    def close(self):
+        self.flush_copy()
+        self.flush_literal()
+
+
+# Function to write a patch that turns the version a signature was made from into new_file
+def write_delta(signature, new_file, patch_file):
+    block_size = signature['block_size']
+    weak_sums = signature['weak']
+    strong_sums = [bytes.fromhex(strong) for strong in signature['strong']]
+    block_count = len(weak_sums)
+    index = {}  # weak checksum -> block numbers with it
+    for block, weak in enumerate(weak_sums):
+        index.setdefault(weak, []).append(block)
+
+    # Function to find a base block matching the window at position, using the weak checksum to rule most out
+    def find_block(window, weak):
+        blocks = index.get(weak)
+        if blocks:
+            strong = _strong_hash(window)
+            for block in blocks:
+                if strong_sums[block] == strong:
+                    return block
+        return None
+
+    file_hasher = hashlib.sha256()
+    result_size = 0
+    with open(new_file, 'rb') as source, open(patch_file, 'wb') as patch:
+        patch.write(PATCH_HEADER.pack(PATCH_MAGIC, block_size, bytes.fromhex(signature['sha256']), bytes(32), 0))
+        writer = _PatchWriter(patch)
+        buffer = b""
+        position = 0
+        eof = False
+        expected_block = 0  # unchanged data carries on from the block after the last match
+        rolling = None  # (a, b) of the adler32 of the window at position while searching byte by byte
+        while True:
+            if not eof and len(buffer) - position < block_size + 1:
+                # Drop what has been handled and read the next slab
+                file_hasher.update(buffer[:position])
+                result_size += position
+                buffer = buffer[position:]
+                position = 0
+                block = source.read(read_size)
+                if block:
+                    buffer += block
+                    continue
+                eof = True
+            if len(buffer) - position < block_size:
+                break
+
+            window = buffer[position:position + block_size]
+            if rolling is None:
+                weak = zlib.adler32(window)
+                # Aligned fast path: most of a changed file is the same blocks in the same order
+                if (expected_block < block_count and weak == weak_sums[expected_block] and
+                        _strong_hash(window) == strong_sums[expected_block]):
+                    writer.copy(expected_block)
+                    position += block_size
+                    expected_block += 1
+                    continue
+                a = weak & 0xffff
+                b = weak >> 16
+            else:
+                a, b = rolling
+                weak = (b << 16) | a
+
+            block = find_block(window, weak)
+            if block is not None:
+                writer.copy(block)
+                position += block_size
+                expected_block = block + 1
+                rolling = None
+                continue
+
+            # No match here, roll the window forward a byte at a time until one is found or the buffer runs out
+            start = position
+            end = len(buffer) - block_size
+            match = None
+            while position < end:
+                out_byte = buffer[position]
+                in_byte = buffer[position + block_size]
+                a = (a - out_byte + in_byte) % ADLER_MOD
+                b = (b - block_size * out_byte + a - 1) % ADLER_MOD
+                position += 1
+                candidates = index.get((b << 16) | a)
+                if candidates:
+                    match = find_block(buffer[position:position + block_size], (b << 16) | a)
+                    if match is not None:
+                        break
+            if position > start:
+                writer.data(buffer[start:position])
+            if match is not None:
+                writer.copy(match)
+                position += block_size
+                expected_block = match + 1
+                rolling = None
+            elif eof and position >= end:
+                break  # Only the last window is left and it matched nothing
+            else:
+                rolling = (a, b)
+
+        # The last few bytes are either the base's own short last block or new data
+        remainder = buffer[position:]
+        tail = signature['tail']
+        if remainder and tail is not None and len(remainder) == tail[0] and _strong_hash(remainder).hex() == tail[1]:
+            writer.copy(block_count)
+        elif remainder:
+            writer.data(remainder)
+        writer.close()
+        file_hasher.update(buffer)
+        result_size += len(buffer)
+
+        patch.seek(0)
+        patch.write(PATCH_HEADER.pack(PATCH_MAGIC, block_size, bytes.fromhex(signature['sha256']),
+                                      file_hasher.digest(), result_size))
+    return file_hasher.hexdigest(), result_size
+
+
+# Function to apply a patch to the file it was made against, writing the new version to output_file
+def apply_delta(base_file, patch_file, output_file):
+    file_hasher = hashlib.sha256()
+    with open(base_file, 'rb') as base, open(patch_file, 'rb') as patch, open(output_file, 'wb') as output:
+        magic, block_size, _, result_sha, result_size = PATCH_HEADER.unpack(patch.read(PATCH_HEADER.size))
+        if magic != PATCH_MAGIC:
+            raise ValueError(f"{patch_file} is not a patch")
+        while op := patch.read(1):
+            if op == b'C':
+                _, first_block, count = COPY_OP.unpack(op + patch.read(COPY_OP.size - 1))
+                base.seek(first_block * block_size)
+                remaining = count * block_size
+                while remaining > 0:
+                    data = base.read(min(remaining, read_size))
+                    if not data:
+                        break
+                    output.write(data)
+                    file_hasher.update(data)
+                    remaining -= len(data)
+            elif op == b'D':
+                _, length = DATA_OP.unpack(op + patch.read(DATA_OP.size - 1))
+                data = patch.read(length)
+                output.write(data)
+                file_hasher.update(data)
+            else:
+                raise ValueError(f"{patch_file} is corrupt")
+        output.flush()
+        os.fsync(output.fileno())
+    return file_hasher.digest() == result_sha and os.path.getsize(output_file) == result_size
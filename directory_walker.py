@@ -0,0 +1,166 @@
+import os
+import re
+import time
+
+import chunk_store
+import delta
+import state_db
+
+# Variable Declaration
+racy_window = 2  # seconds, a directory changed this recently may change again within its mtime's resolution
+
+
+# Function to turn one .gitignore-style pattern into (regex, negated, directory only)
+def _compile_pattern(pattern):
+    negated = pattern.startswith('!')
+    if negated:
+        pattern = pattern[1:]
+    directory_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    # Like .gitignore, a pattern with a slash in it is matched from the root, otherwise at any depth
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    regex = ''
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith('**/', index):
+            regex += '(?:.*/)?'
+            index += 3
+        elif pattern.startswith('/**', index) and index + 3 == len(pattern):
+            regex += '/.*'
+            index += 3
+        elif pattern.startswith('**', index):
+            regex += '.*'
+            index += 2
+        elif pattern[index] == '*':
+            regex += '[^/]*'
+            index += 1
+        elif pattern[index] == '?':
+            regex += '[^/]'
+            index += 1
+        elif pattern[index] == '[' and ']' in pattern[index + 2:]:
+            end = pattern.index(']', index + 2)
+            characters = pattern[index + 1:end]
+            if characters.startswith('!'):
+                characters = '^' + characters[1:]
+            characters = characters.replace('\\', '\\\\')
+            regex += f"[{characters}]"
+            index = end + 1
+        else:
+            regex += re.escape(pattern[index])
+            index += 1
+
+    prefix = '' if anchored else '(?:.*/)?'
+    return re.compile(prefix + regex + '$'), negated, directory_only
+
+
+# Function to compile a list of .gitignore-style patterns, blank lines and # comments are skipped
+def compile_patterns(patterns):
+    return [_compile_pattern(pattern.strip()) for pattern in patterns
+            if pattern.strip() and not pattern.strip().startswith('#')]
+
+
+# Function to check if a path relative to the tracked directory is excluded (the last matching pattern wins, and
+# patterns starting with ! include paths again)
+def is_ignored(compiled_patterns, relative_path, is_directory=False):
+    ignored = False
+    for regex, negated, directory_only in compiled_patterns:
+        if directory_only and not is_directory:
+            continue
+        if regex.match(relative_path):
+            ignored = not negated
+    return ignored
+
+
+# Function to check if a file is excluded, either itself or because one of its folders is
+def is_path_ignored(compiled_patterns, relative_path):
+    parts = relative_path.split('/')
+    for depth in range(1, len(parts)):
+        if is_ignored(compiled_patterns, '/'.join(parts[:depth]), True):
+            return True
+    return is_ignored(compiled_patterns, relative_path)
+
+
+# Function to list every file under a directory as {relative path: local path}, with relative paths using / so they
+# can be used on GitHub. scan_cache holds what each folder contained when it was last listed, and a folder is only
+# listed again if its mtime changed, so a rescan costs one stat per folder rather than one per file. Returns
+# (files, new scan cache).
+def walk_directory(local_root, patterns, scan_cache=None):
+    compiled_patterns = compile_patterns(patterns)
+    scan_cache = scan_cache or {}
+    new_cache = {}
+    files = {}
+    now = time.time()
+    folders = ['']
+    while folders:
+        relative_folder = folders.pop()
+        folder = os.path.join(local_root, *relative_folder.split('/')) if relative_folder else local_root
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            continue
+
+        cached = scan_cache.get(relative_folder)
+        if cached is None or cached['mtime'] != mtime:
+            file_names = []
+            folder_names = []
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            # Folders are not followed through links, so a link back up the tree can't loop
+                            if entry.is_dir(follow_symlinks=False):
+                                folder_names.append(entry.name)
+                            elif entry.is_file():
+                                file_names.append(entry.name)
+                        except OSError:
+                            continue
+            except OSError as e:
+                print(f"Could not list {folder}: {e}")
+                continue
+            # A folder that changed very recently could change again without its mtime moving on, so it is
+            # listed again next time
+            cached = {'mtime': mtime if now - mtime / 1e9 > racy_window else None,
+                      'files': file_names, 'folders': folder_names}
+        new_cache[relative_folder] = cached
+
+        prefix = relative_folder + '/' if relative_folder else ''
+        for name in cached['files']:
+            relative_path = prefix + name
+            if not is_ignored(compiled_patterns, relative_path):
+                files[relative_path] = os.path.join(folder, name)
+        for name in cached['folders']:
+            relative_path = prefix + name
+            # Excluded folders are never looked inside
+            if not is_ignored(compiled_patterns, relative_path, True):
+                folders.append(relative_path)
+
+    return dict(sorted(files.items())), new_cache
+
+
+# Function to expand every tracked directory into {GitHub path: local path} for the files it contains. Files that
+# are only on GitHub (added from another machine) are included too when a snapshot is given, so they can be
+# downloaded. Paths in skip (files tracked on their own) are left out.
+def expand_tracked_roots(snapshot=None, skip=()):
+    root_files = {}
+    for root in state_db.get_tracked_roots():
+        github_folder = root['github_folder']
+        files, scan_cache = walk_directory(root['local_root'], root['patterns'], root['scan_cache'])
+        if scan_cache != root['scan_cache']:
+            state_db.save_scan_cache(github_folder, scan_cache)
+        for relative_path, local_file in files.items():
+            root_files[f"{github_folder}/{relative_path}"] = local_file
+
+        if snapshot is not None:
+            compiled_patterns = compile_patterns(root['patterns'])
+            prefix = github_folder + '/'
+            for github_path in snapshot:
+                if not github_path.startswith(prefix):
+                    continue
+                github_file = delta.logical_path(chunk_store.logical_path(github_path))
+                relative_path = github_file[len(prefix):]
+                if github_file not in root_files and not is_path_ignored(compiled_patterns, relative_path):
+                    root_files[github_file] = os.path.join(root['local_root'], *relative_path.split('/'))
+
+    return {github_file: local_file for github_file, local_file in root_files.items() if github_file not in skip}
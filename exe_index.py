@@ -0,0 +1,169 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+# Variable Declaration
+index_file = 'exe_index.json'
+racy_window = 2  # seconds, folders changed this recently are listed again next time
+default_workers = min(32, (os.cpu_count() or 1) * 4)  # listing folders mostly waits on the disk
+
+# Folders that never hold anything worth watching, they are not looked inside at all (compared lowercase)
+pruned_folders = frozenset([
+    "$recycle.bin", "system volume information", "winsxs", ".git", "node_modules", "__pycache__",
+    "_commonredist", "commonredist", "directx", "dotnet", "vcredist", "shadercache", "steamworks shared",
+    "temp", "logs", "crashes", "crashreports", "localization"
+])
+
+# Folders whose name says nothing about the app, the app is named after the folder above instead (compared
+# lowercase)
+non_descriptive_folders = frozenset(name.lower() for name in [
+    "bin", "debug", "release", "distribution", "thirdparty", "Binaries", "Win64", "usermods", "Redistributables",
+    "en-us", "Engine", "Extras", "redist", "vcred", "Support", "VS2010Runtime", "VS2012Runtime", "VS2015Runtime",
+    "VS2017Runtime"
+])
+
+_name_prefix_pattern = re.compile(r'^(installer|launcher|service|setup|client|app|application)', re.IGNORECASE)
+_separator_pattern = re.compile(r'[\s_-]+')
+
+_index = None  # normalised root -> relative folder -> {'mtime', 'exes', 'folders'}
+_index_lock = threading.Lock()
+
+
+# Function to strip generic words and separators from an app name
+def clean_app_name(app_name, file_name):
+    app_name = _name_prefix_pattern.sub('', app_name).strip()
+    app_name = _separator_pattern.sub(' ', app_name).strip()
+    return app_name or file_name
+
+
+# Function to name an executable after the folder it is in, skipping up to two non-descriptive folders
+def extract_app_name_from_path(executable_path):
+    directory = os.path.dirname(executable_path)
+    file_name = os.path.basename(executable_path)
+    app_name = os.path.basename(directory)
+    for _ in range(2):
+        if app_name.lower() not in non_descriptive_folders:
+            break
+        directory = os.path.dirname(directory)
+        app_name = os.path.basename(directory)
+
+    app_name = clean_app_name(app_name, file_name)
+    return f"{app_name} - {file_name}" if app_name else file_name
+
+
+# Function to load the index from disk (only done once per process)
+def _load_index():
+    global _index
+    if _index is None:
+        _index = {}
+        if os.path.exists(index_file):
+            try:
+                with open(index_file, 'r') as f:
+                    _index = json.load(f)
+            except (OSError, ValueError):
+                _index = {}
+    return _index
+
+
+# Function to write the index back to disk
+def _save_index():
+    temp_file = index_file + ".tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(_index, f, separators=(',', ':'))
+    os.replace(temp_file, index_file)
+
+
+# Function to list the executables and subfolders of one folder
+def _list_folder(folder, now):
+    mtime = os.stat(folder).st_mtime_ns
+    exes = []
+    folders = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            try:
+                # Folders are not followed through links, so a link back up the tree can't loop
+                if entry.is_dir(follow_symlinks=False):
+                    folders.append(entry.name)
+                elif entry.name.lower().endswith('.exe') and entry.is_file():
+                    exes.append(entry.name)
+            except OSError:
+                continue
+    return {'mtime': mtime if now - mtime / 1e9 > racy_window else None, 'exes': exes, 'folders': folders}
+
+
+# Function to walk several folder trees at once. Each worker takes a folder off a shared queue and puts its
+# subfolders back on, so one big tree is spread over every worker. Folders whose mtime hasn't changed since the
+# last scan aren't listed again. Returns ({normalised root: {relative folder: entry}}, folders listed).
+def _scan_roots(roots, old_index, workers):
+    new_index = {root: {} for root in roots}
+    listed = [0]
+    lock = threading.Lock()
+    work = queue.Queue()
+    now = time.time()
+    for root in roots:
+        work.put((root, ''))
+
+    def worker():
+        while (task := work.get()) is not None:
+            root, relative_folder = task
+            try:
+                folder = os.path.join(root, relative_folder) if relative_folder else root
+                cached = old_index.get(root, {}).get(relative_folder)
+                try:
+                    if cached is None or cached['mtime'] != os.stat(folder).st_mtime_ns:
+                        cached = _list_folder(folder, now)
+                        with lock:
+                            listed[0] += 1
+                except OSError:
+                    continue
+                with lock:
+                    new_index[root][relative_folder] = cached
+                for name in cached['folders']:
+                    if name.lower() not in pruned_folders:
+                        work.put((root, os.path.join(relative_folder, name)))
+            finally:
+                work.task_done()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    work.join()
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+    return new_index, listed[0]
+
+
+# Function to find every executable under the search paths as {app name: file name}, skipping files whose name
+# contains a blacklisted word. The folder listings are kept in exe_index.json so later searches only list folders
+# that changed.
+def find_executables(search_paths, blacklist=None, workers=default_workers):
+    if blacklist is None:
+        blacklist = []
+
+    # The index is keyed by the normalised path, but apps are named from the path as it was typed
+    roots = {os.path.normcase(os.path.abspath(path)): os.path.abspath(path) for path in search_paths
+             if os.path.isdir(path)}
+    start = time.monotonic()
+    with _index_lock:
+        index = _load_index()
+        new_index, listed = _scan_roots(roots, index, workers)
+        index.update(new_index)
+        _save_index()
+
+    executables = {}
+    folders = 0
+    for root, root_path in roots.items():
+        folders += len(new_index[root])
+        for relative_folder, entry in new_index[root].items():
+            for file in entry['exes']:
+                if not any(word in file for word in blacklist):
+                    full_path = os.path.join(root_path, relative_folder, file)
+                    executables[extract_app_name_from_path(full_path)] = file
+    print(f"Found {len(executables)} executable(s) in {folders} folder(s), {listed} listed again, in "
+          f"{time.monotonic() - start:.1f}s.")
+    return executables
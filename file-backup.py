@@ -1,8 +1,6 @@
 import hashlib
-import json
 import logging
 import os
-import re
 import shutil
 import subprocess
 import sys
@@ -10,13 +8,29 @@ import time
 import requests
 import base64
 import winshell
-import psutil
 from colorama import Fore, Style, init
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime, timezone
 from dateutil import tz
 
+import batch_commit
+import chunk_store
+import delta
+import directory_walker
+import exe_index
+import file_compression
+import file_options
+import file_transfer
+import github_client
+import hash_cache
+import process_catalogue
+import process_monitor
+import process_search
+import remote_snapshot
+import settings_store
+import state_db
+
 # Declare program version
 __version__ = "0.6.0"
 
@@ -29,7 +43,8 @@ GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
 HEADERS = {'Authorization': f'token {GITHUB_TOKEN}'}
 
 # Variables setup
-tracking_file = 'files_to_track.json'
+version_file_name = "version.txt"  # read by the launcher instead of running this exe to ask its version
+queued_uploads = []  # GitHub paths queued for upload during the current check
 
 # Create and configure logger
 logging.basicConfig(filename="FileBackup.log",
@@ -41,19 +56,10 @@ logging.basicConfig(filename="FileBackup.log",
 init()
 
 
-# Hashing function to get the content hash of a file
-def get_file_hash(filename):
-    hasher = hashlib.sha256()  # Use SHA-256 for hashing
-    with open(filename, 'rb') as f:
-        while chunk := f.read(8192):  # Read in chunks to avoid memory issues
-            hasher.update(chunk)
-    return hasher.hexdigest()
-
-
 # Get the contents of the file from GitHub
 def get_github_file_content(filename):
     url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{filename}"
-    response = requests.get(url, headers=HEADERS)
+    response = github_client.get(url, headers=HEADERS)
 
     if response.status_code == 200:
         file_info = response.json()
@@ -70,7 +76,7 @@ def get_github_file_content(filename):
 
             # Fetch blob via git/blobs using the SHA
             blob_url = f"https://api.github.com/repos/{GITHUB_REPO}/git/blobs/{blob_sha}"
-            blob_response = requests.get(blob_url, headers=HEADERS)
+            blob_response = github_client.get(blob_url, headers=HEADERS)
 
             if blob_response.status_code == 200:
                 blob_info = blob_response.json()
@@ -87,11 +93,28 @@ def get_github_file_content(filename):
         return None
 
 
+# Function to find the manifest of a file stored in chunks or as deltas on GitHub, returning (path, manifest). The
+# path is None if the file is stored as it is, and the manifest is None if it couldn't be fetched.
+def get_github_manifest(snapshot, github_file):
+    if chunk_store.is_chunked_on_github(snapshot, github_file):
+        return chunk_store.manifest_path(github_file), chunk_store.fetch_manifest(GITHUB_REPO, HEADERS, github_file)
+    if delta.is_delta_on_github(snapshot, github_file):
+        return delta.manifest_path(github_file), delta.fetch_manifest(GITHUB_REPO, HEADERS, github_file)
+    return None, None
+
+
+# Function to get the SHA-256 of a GitHub file's uncompressed content if it was uploaded compressed, or None
+def get_github_content_hash(github_file, snapshot):
+    sha, size = snapshot[github_file]
+    url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/{remote_snapshot.branch_name}/{github_file}"
+    return file_compression.remote_content_hash(url, HEADERS, sha, size)
+
+
 # Get last modified date of the GitHub file by finding the latest commit
 def get_github_last_modified(filename):
     url = f"https://api.github.com/repos/{GITHUB_REPO}/commits"
     params = {'path': filename, 'per_page': 1}  # Only fetch the most recent commit affecting the file
-    response = requests.get(url, headers=HEADERS, params=params)
+    response = github_client.get(url, headers=HEADERS, params=params)
 
     if response.status_code == 200:
         commit_data = response.json()
@@ -140,42 +163,47 @@ def add_shortcut_to_startup(exe_path):
 # Function to upload a local file to GitHub
 def upload_to_github(local_file, github_file):
     try:
-        # Read the local file content
-        with open(local_file, 'rb') as f:
-            content = f.read()
-
-        # Convert the content to Base64 encoding required by GitHub API
-        encoded_content = base64.b64encode(content).decode('utf-8')
-
-        # Check if the file exists on GitHub
+        # Check if the file exists on GitHub using the snapshot shared by this check cycle
         url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{github_file}"
-        response = requests.get(url, headers=HEADERS)
+        snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS)
+        if snapshot is None:
+            print("Error checking file existence on GitHub.")
+            return False
 
-        if response.status_code == 200:
-            # File exists, get its SHA to update the file
-            file_info = response.json()
-            sha = file_info['sha']
+        if github_file in snapshot:
+            # File exists, use its SHA to update the file
+            sha = snapshot[github_file][0]
             message = f"Update {github_file} via script"
             data = {
                 "message": message,
-                "content": encoded_content,
                 "sha": sha
             }
-        elif response.status_code == 404:
+        else:
             # File doesn't exist, create a new one
             message = f"Create {github_file} via script"
             data = {
-                "message": message,
-                "content": encoded_content
+                "message": message
             }
-        else:
-            print(f"Error checking file existence on GitHub: {response.status_code}")
-            return False
 
-        # Send PUT request to create/update the file
-        response = requests.put(url, headers=HEADERS, json=data)
+        # Send PUT request to create/update the file, the content is read and Base64 encoded as it is sent
+        json_headers = {**HEADERS, 'Content-Type': 'application/json'}
+        start = time.monotonic()
+        body = file_transfer.Base64JsonBody(local_file, data)
+        response = github_client.put(url, headers=json_headers, data=body)
+        if response.status_code in [409, 422]:
+            # The snapshot is out of date (the file changed on GitHub since), so fetch the current SHA and retry
+            current = github_client.get(url, headers=HEADERS)
+            if current.status_code == 200:
+                data["sha"] = current.json()['sha']
+            elif current.status_code == 404:
+                data.pop("sha", None)
+            body = file_transfer.Base64JsonBody(local_file, data)
+            response = github_client.put(url, headers=json_headers, data=body)
         if response.status_code in [200, 201]:
-            print(f"Successfully uploaded {github_file} to GitHub.")
+            uploaded = response.json()['content']
+            remote_snapshot.update_remote_snapshot(github_file, uploaded['sha'], uploaded['size'])
+            throughput = file_transfer.throughput_message(body.size, time.monotonic() - start)
+            print(f"Successfully uploaded {github_file} to GitHub ({throughput}).")
             return True
         else:
             print(f"Error uploading file to GitHub: {response.status_code}")
@@ -186,33 +214,135 @@ def upload_to_github(local_file, github_file):
         return False
 
 
-# Compare the local and GitHub files
-def compare_files(github_file, local_file):
+# Function to queue a local file for the next batched commit, stored the way its file options ask for
+def queue_file_upload(settings, local_file, github_file):
+    options = file_options.get_file_options(settings, github_file)
+    compression = options['compression'] if options['compression'] != 'none' else None
+    # A copy stored another way before the storage mode changed would be restored instead of this one
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS) or {}
+    if options['storage'] != 'chunked' and chunk_store.manifest_path(github_file) in snapshot:
+        batch_commit.queue_delete(chunk_store.manifest_path(github_file))
+    if options['storage'] != 'delta' and delta.manifest_path(github_file) in snapshot:
+        delta.queue_delete_stored(GITHUB_REPO, HEADERS, github_file)
+
+    if options['storage'] == 'chunked':
+        return chunk_store.upload_chunked(GITHUB_REPO, HEADERS, local_file, github_file, compression)
+    if options['storage'] == 'delta':
+        return delta.upload_delta(GITHUB_REPO, HEADERS, local_file, github_file, compression)
+    batch_commit.queue_upload(local_file, github_file, compression)
+    return True
+
+
+# Function to queue a file that is new in a tracked directory for the upload at the end of the check
+def queue_new_root_file(settings, local_file, github_file):
+    if queue_file_upload(settings, local_file, github_file):
+        print("Queued local version for upload to GitHub.")
+        queued_uploads.append(github_file)
+    else:
+        state_db.record_sync(github_file, 'upload', 'failed')
+    return True
+
+
+# Function to handle a file in a tracked directory that isn't on GitHub: one synced here before was deleted on GitHub,
+# anything else is new and is queued for upload
+def handle_root_file_missing_on_github(settings, local_file, github_file):
+    if state_db.was_synced(github_file):
+        print(f"{github_file} was deleted on GitHub. Keeping the local copy.")
+        return True
+    print(f"{local_file} is new in a tracked directory. Uploading it to GitHub.")
+    return queue_new_root_file(settings, local_file, github_file)
+
+
+# Compare the local and GitHub files (from_root is set for files found in a tracked directory)
+def compare_files(settings, github_file, local_file, compare_mode='blob_sha', from_root=False):
     # Check if the local file exists
+    if not os.path.exists(local_file) and from_root:
+        if state_db.was_synced(github_file):
+            # It was synced here before, so it was deleted locally rather than added on GitHub
+            print(f"{local_file} was deleted locally. Keeping the GitHub copy.")
+            return True
+        # Files in a tracked directory that are only on GitHub were added from another machine
+        print(f"{github_file} is new on GitHub. Downloading it to {local_file}.")
+        downloaded = download_github_file(github_file, local_file)
+        state_db.record_sync(github_file, 'download', 'downloaded' if downloaded else 'failed')
+        return True
     if not os.path.exists(local_file):
         print(f"Local file {local_file} is missing. Removing from tracking.")
         return False  # Indicate that the file should be removed
 
-    # Fetch the GitHub file content
-    github_hash = get_github_file_content(github_file)
-    if github_hash is None:
-        print(f"GitHub file {github_file} is missing. Removing from tracking.")
-        return False  # Indicate that the file should be removed
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS)
+    history_file = github_file  # The GitHub path whose commits date the file
+    manifest_file, manifest = get_github_manifest(snapshot, github_file) if snapshot is not None else (None, None)
+    if manifest_file is not None:
+        # Chunked and delta-stored files are compared by the SHA-256 of their whole content, which their manifest
+        # records
+        if manifest is None:
+            print(f"Could not fetch the manifest of {github_file}. Skipping it for now.")
+            return True
+        github_hash = manifest['sha256']
+        local_hash = hash_cache.get_file_hash(local_file)
+        history_file = manifest_file
+        print(f"Local file hash: {local_hash}")
+        print(f"GitHub file hash ({manifest_file}): {github_hash}")
+    elif compare_mode == 'blob_sha':
+        # Compare git blob SHAs so no file content has to be downloaded
+        if snapshot is None:
+            print(f"Could not fetch the GitHub file list. Skipping {github_file} for now.")
+            return True  # Keep tracking, the file may still exist on GitHub
+        if github_file not in snapshot and from_root:
+            return handle_root_file_missing_on_github(settings, local_file, github_file)
+        if github_file not in snapshot:
+            print(f"GitHub file {github_file} is missing. Removing from tracking.")
+            return False  # Indicate that the file should be removed
+        github_hash = snapshot[github_file][0]
+        local_hash = hash_cache.get_git_blob_sha(local_file)
+        content_hash = None
+        if local_hash != github_hash:
+            # A compressed upload never matches the local blob SHA, so compare its uncompressed content's SHA-256
+            try:
+                content_hash = get_github_content_hash(github_file, snapshot)
+            except OSError as e:
+                print(f"{e}. Skipping {github_file} for now.")
+                return True
+        if content_hash is not None:
+            local_hash = hash_cache.get_file_hash(local_file)
+            github_hash = content_hash
+            print(f"Local file hash: {local_hash}")
+            print(f"GitHub file hash (compressed): {github_hash}")
+        else:
+            print(f"Local file blob SHA: {local_hash}")
+            print(f"GitHub file blob SHA: {github_hash}")
+    else:
+        # Fetch the GitHub file content
+        github_content = get_github_file_content(github_file)
+        if github_content is None:
+            # Only stop tracking the file if GitHub's file list confirms it is gone, not on any failed request
+            if snapshot is not None and github_file not in snapshot and from_root:
+                return handle_root_file_missing_on_github(settings, local_file, github_file)
+            if snapshot is not None and github_file not in snapshot:
+                print(f"GitHub file {github_file} is missing. Removing from tracking.")
+                return False  # Indicate that the file should be removed
+            print(f"Could not fetch {github_file} from GitHub. Skipping it for now.")
+            return True
+
+        # GitHub file content is base64-encoded, so we need to decode it
+        github_data = base64.b64decode(github_content)
+        header = file_compression.parse_header(github_data)
+        # Compressed uploads carry the SHA-256 of their uncompressed content in their header
+        github_hash = header[1] if header is not None else hashlib.sha256(github_data).hexdigest()
+        local_hash = hash_cache.get_file_hash(local_file)
+        print(f"Local file hash: {local_hash}")
+        print(f"GitHub file hash: {github_hash}")
 
-    # GitHub file content is base64-encoded, so we need to decode it
-    import base64
-    github_hash_decoded = hashlib.sha256(base64.b64decode(github_hash)).hexdigest()
-    local_hash = get_file_hash(local_file)
-    print(f"Local file hash: {local_hash}")
-    print(f"GitHub file hash: {github_hash_decoded}")
     # Check if the files are identical
-    if local_hash == github_hash_decoded:
+    if local_hash == github_hash:
         print("Files are identical. No need to update.")
+        state_db.record_sync(github_file, 'check', 'identical', local_hash, github_hash)
         return True  # Indicate that the file is okay
 
     # If hashes differ, check the modification dates
     local_last_modified = os.path.getmtime(local_file)
-    github_last_modified = get_github_last_modified(github_file)
+    github_last_modified = get_github_last_modified(history_file)
     if github_last_modified is None:
         print(f"Could not retrieve last modified date from GitHub for {github_file}.")
         return True  # No need to remove if we can't get the last modified date
@@ -227,15 +357,23 @@ def compare_files(github_file, local_file):
     if local_datetime > github_datetime:
         user_choice = input("Your local file is newer. Do you want to upload it to GitHub? (y/n): ")
         if user_choice.lower() == 'y':
-            # Upload the local file to GitHub
-            print("Uploading local version to GitHub...")
-            upload_to_github(local_file, github_file)
+            # Queue the upload so every changed file goes up in one commit at the end of the check
+            if queue_file_upload(settings, local_file, github_file):
+                print("Queued local version for upload to GitHub.")
+                queued_uploads.append(github_file)
+                return True
+            state_db.record_sync(github_file, 'upload', 'failed')
+            return True
     else:
         user_choice = input("The GitHub file is newer. Do you want to download and replace your local version? (y/n): ")
         if user_choice.lower() == 'y':
             # Download the GitHub version and replace the local file
             print("Downloading GitHub version...")
-            download_github_file(github_file, local_file)
+            downloaded = download_github_file(github_file, local_file)
+            state_db.record_sync(github_file, 'download', 'downloaded' if downloaded else 'failed',
+                                 remote_hash=github_hash)
+            return True
+    state_db.record_sync(github_file, 'check', 'skipped', local_hash, github_hash)
     return True  # Indicate that the file is okay
 
 
@@ -271,57 +409,16 @@ def print_in_multi_colour_and_log(message_sections, logging_func=None):
         logging.error(f"Error: {str(e)}")
 
 
-# Function to load settings from the JSON file
+# Function to load settings from the JSON file (kept in memory, and only read again if the file changed)
 def load_settings():
-    if not os.path.exists(tracking_file):
-        save_settings({"do_setup": True, "blacklist": [], 'process_watchlist': [], "files_to_track": {},
-                       "file_check_interval": 60, "game_check_interval": 90, "show_console_if_input": True})
-        print_and_log("File not found. Created new default tracking file.", logging.info)
-    with open(tracking_file, 'r') as f:
-        settings = json.load(f)
-        print_and_log("Successfully loaded tracking file.", logging.info)
-
-    # Check if needed settings exist and create them if not
-    if 'do_setup' not in settings:
-        settings['do_setup'] = True
-        save_settings(settings)
-        print_and_log("Added 'do_setup' setting.", logging.info)
-    if 'blacklist' not in settings:
-        settings['blacklist'] = []
-        save_settings(settings)
-        print_and_log("Added 'blacklist' setting.", logging.info)
-    if 'process_watchlist' not in settings:
-        settings['process_watchlist'] = []
-        save_settings(settings)
-        print_and_log("Added 'process_watchlist' setting.", logging.info)
-    if 'files_to_track' not in settings:
-        settings['files_to_track'] = {}
-        save_settings(settings)
-        print_and_log("Added 'do_setup' setting.", logging.info)
-    if 'file_check_interval' not in settings:
-        settings['file_check_interval'] = 60
-        save_settings(settings)
-        print_and_log("Added 'file_check_interval' setting.", logging.info)
-    if 'game_check_interval' not in settings:
-        settings['game_check_interval'] = 15
-        save_settings(settings)
-        print_and_log("Added 'game_check_interval' setting.", logging.info)
-    if 'show_console_if_input' not in settings:
-        settings['show_console_if_input'] = True
-        save_settings(settings)
-        print_and_log("Added 'show_console_if_input' setting.", logging.info)
-
-    # Check if obsolete settings exists and remove them
-    if 'whitelist' in settings:
-        del settings['whitelist']
-        save_settings(settings)
+    settings = settings_store.load_settings()
+    github_client.configure(settings['http_timeouts'])
     return settings
 
 
-# Function to save options to the JSON file
+# Function to save options to the JSON file (written shortly after, so several changes cost one write)
 def save_settings(settings):
-    with open(tracking_file, 'w') as f:
-        json.dump(settings, f, indent=4)
+    settings_store.save_settings(settings)
 
 
 # Function to change an option in the tracking file
@@ -330,14 +427,6 @@ def update_setting(new_setting, setting_name, setting_file):
     save_settings(setting_file)
 
 
-# Function to get the key from a value in a dictionary
-def get_key_from_value(d, value):
-    for key, val in d.items():
-        if val == value:
-            return key
-    return None  # Return None if not found
-
-
 # Function to check if a file is already tracked and handle upload logic
 def handle_file_tracking(settings, local_file, github_file):
     # Ensure the tracking dictionary exists
@@ -345,7 +434,7 @@ def handle_file_tracking(settings, local_file, github_file):
         settings['files_to_track'] = {}
 
     # Check if the file is already being tracked
-    possible_key = get_key_from_value(settings['files_to_track'], local_file)
+    possible_key = settings['files_to_track'].find_github_file(local_file)
 
     if github_file in settings['files_to_track']:
         print(f"'{github_file}' is already tracking local file '{settings['files_to_track'][github_file]}'.")
@@ -353,8 +442,14 @@ def handle_file_tracking(settings, local_file, github_file):
         print(f"The local file '{local_file}' is already being tracked under a different GitHub entry"
               f" '{possible_key}'.")
     else:
-        # Upload the local file to GitHub
-        success = upload_to_github(local_file, github_file)
+        if file_options.get_file_options(settings, github_file) != file_options.default_options:
+            # Chunked or compressed files go up through a batched commit of their blobs
+            remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS, refresh=True)
+            success = (queue_file_upload(settings, local_file, github_file) and
+                       bool(batch_commit.flush_pending_changes(GITHUB_REPO, HEADERS, f"Add {github_file} via script")))
+        else:
+            # Upload the local file to GitHub
+            success = upload_to_github(local_file, github_file)
         if success:
             # Update the 'files_to_track' entry in the settings
             settings['files_to_track'][github_file] = local_file
@@ -373,31 +468,59 @@ def add_file_to_tracking(settings):
         directory_path = input("Enter the directory path: ").strip()
 
         # Check if the path is a valid directory
-        if os.path.isdir(directory_path):
-            files_in_directory = os.listdir(directory_path)
-            num_files = len(files_in_directory)
-
-            # Warn if there are more than 10 files
-            if num_files > 10:
-                warning = (input(f"The directory contains {num_files} files. Do you want to proceed? (yes/no): ")
-                           .strip().lower())
-                if warning != 'yes':
-                    print("Operation canceled.")
-                    return
-
-            # Ask for the GitHub folder name
-            github_folder_name = (input("Enter the name of the GitHub folder where the files should be uploaded: ")
-                                  .strip())
-
-            # Track each file in the directory
-            for file_name in files_in_directory:
-                local_file = os.path.join(directory_path, file_name)
-                github_file = f"{github_folder_name}/{file_name}"  # Concatenate the folder name
-                handle_file_tracking(settings, local_file, github_file)
-
-        else:
+        if not os.path.isdir(directory_path):
             print("Invalid directory path.")
             return
+        directory_path = os.path.abspath(directory_path)
+
+        # Ask for the GitHub folder name
+        github_folder_name = (input("Enter the name of the GitHub folder where the files should be uploaded: ")
+                              .strip().strip('/'))
+        if not github_folder_name:
+            print("A GitHub folder is needed to track a directory.")
+            return
+
+        print("Enter patterns for files to leave out, like a .gitignore (e.g. *.tmp, cache/, !keep.tmp).")
+        patterns = [pattern.strip() for pattern in input("Patterns, separated by commas (blank for none): ").split(',')
+                    if pattern.strip()]
+
+        # Every file in the directory and its subfolders, keeping their relative paths under the GitHub folder
+        files, scan_cache = directory_walker.walk_directory(directory_path, patterns)
+        num_files = len(files)
+
+        # Warn if there are more than 10 files
+        if num_files > 10:
+            warning = (input(f"The directory contains {num_files} files. Do you want to proceed? (yes/no): ")
+                       .strip().lower())
+            if warning != 'yes':
+                print("Operation canceled.")
+                return
+
+        # Queue each file in the directory, then upload them all in one commit
+        remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS, refresh=True)
+        queued_files = {}
+        for relative_path, local_file in files.items():
+            github_file = f"{github_folder_name}/{relative_path}"
+            if settings['files_to_track'].find_github_file(local_file) is not None:
+                print(f"The local file '{local_file}' is already being tracked on its own.")
+            elif queue_file_upload(settings, local_file, github_file):
+                queued_files[github_file] = local_file
+
+        print(f"Uploading {len(queued_files)} file(s) to GitHub...")
+        committed = batch_commit.flush_pending_changes(GITHUB_REPO, HEADERS, f"Add {github_folder_name} via script")
+        uploaded = 0
+        for github_file, local_file in queued_files.items():
+            stored = {github_file, chunk_store.manifest_path(github_file), delta.manifest_path(github_file)}
+            if committed & stored:
+                uploaded += 1
+                state_db.record_sync(github_file, 'upload', 'uploaded')
+            else:
+                print(f"Failed to upload {local_file} to GitHub.")
+
+        # The directory is tracked as a whole, so files added to it later are picked up by the next check
+        state_db.add_tracked_root(github_folder_name, directory_path, patterns)
+        state_db.save_scan_cache(github_folder_name, scan_cache)
+        print(f"Uploaded {uploaded} file(s) and added {directory_path} to the tracking list as '{github_folder_name}'.")
     else:
         # Existing functionality for a single file
         github_file = input("Enter the GitHub file path (e.g., folder/name.filetype or name.filetype): ")
@@ -421,7 +544,7 @@ def clear_console():
 # Function to check for internet connection
 def check_internet():
     try:
-        requests.get('https://www.google.com/', timeout=5)
+        github_client.get('https://www.google.com/', timeout=5, retries=0)
         return True
     except requests.ConnectionError:
         return False
@@ -482,39 +605,36 @@ def specific_input(question_to_ask, required_answers=None, input_type=None, exit
 
 
 # Fetch the list of files from the GitHub repository with a blacklist filter
-def list_github_files(settings, blacklist=None, path=""):
+def list_github_files(settings, blacklist=None, path="", directories=None):
     if blacklist is None:
         blacklist = []  # Default empty blacklist
 
-    url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{path}"
-    response = requests.get(url, headers=HEADERS)
+    if directories is None:
+        # One recursive tree listing replaces a request per directory
+        snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS)
+        if snapshot is None:
+            print("Error fetching files from GitHub.")
+            return []
+        directories = remote_snapshot.group_snapshot_by_directory(snapshot)
 
-    if response.status_code == 200:
-        files = response.json()  # JSON contains a list of files with their details
-        file_list = []
+    file_list = []
+    for file_path, file_type in directories.get(path, {}).items():
+        # Check if the file is a blacklisted file or is inside a blacklisted directory
+        is_blacklisted = any(file_path.endswith(blacklisted) or file_path.startswith(blacklisted + '/')
+                             for blacklisted in blacklist)
 
-        for file in files:
-            file_path = file['path']
+        if file_type == 'file' and not is_blacklisted:
+            file_list.append(file_path)
 
-            # Check if the file is a blacklisted file or is inside a blacklisted directory
-            is_blacklisted = any(file_path.endswith(blacklisted) or file_path.startswith(blacklisted + '/')
-                                 for blacklisted in blacklist)
+        elif file_type == 'dir':
+            # Recursively get nested files
+            nested_files = list_github_files(settings, blacklist, file_path, directories)
+            # Only add directories that don't contain blacklisted files
+            if not any(nested_file.endswith(w) or nested_file.startswith(w) for nested_file in nested_files
+                       for w in blacklist):
+                file_list.extend(nested_files)
 
-            if file['type'] == 'file' and not is_blacklisted:
-                file_list.append(file_path)
-
-            elif file['type'] == 'dir':
-                # Recursively get nested files
-                nested_files = list_github_files(settings, blacklist, file_path)
-                # Only add directories that don't contain blacklisted files
-                if not any(nested_file.endswith(w) or nested_file.startswith(w) for nested_file in nested_files
-                           for w in blacklist):
-                    file_list.extend(nested_files)
-
-        return file_list
-    else:
-        print(f"Error fetching files from GitHub: {response.status_code}")
-        return []
+    return file_list
 
 
 # Prompt the user to specify a save location
@@ -548,17 +668,32 @@ def download_github_file(github_file, save_location):
         backup_location = save_location + ".bak"
         shutil.copy2(save_location, backup_location)
         print(f"Backup created at {backup_location}")
+    # Files in a tracked directory can be in folders that don't exist locally yet
+    os.makedirs(os.path.dirname(os.path.abspath(save_location)), exist_ok=True)
 
-    url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/main/{github_file}"
-    response = requests.get(url, headers=HEADERS)
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS) or {}
+    if chunk_store.is_chunked_on_github(snapshot, github_file):
+        if chunk_store.restore_chunked(GITHUB_REPO, HEADERS, github_file, save_location):
+            print(f"Downloaded {github_file} to {save_location}")
+            return True
+        print(f"Error downloading {github_file}.")
+        return False
+    if delta.is_delta_on_github(snapshot, github_file):
+        if delta.restore_delta(GITHUB_REPO, HEADERS, github_file, save_location):
+            print(f"Downloaded {github_file} to {save_location}")
+            return True
+        print(f"Error downloading {github_file}.")
+        return False
 
-    if response.status_code == 200:
-        with open(save_location, 'wb') as file:
-            file.write(response.content)
+    # Stream into a temporary file and only replace the local copy once the content matches GitHub's blob SHA
+    url = f"https://raw.githubusercontent.com/{GITHUB_REPO}/{remote_snapshot.branch_name}/{github_file}"
+    expected_sha, expected_size = snapshot.get(github_file, (None, None))
+
+    if file_transfer.download_to_file(url, HEADERS, save_location, expected_sha, expected_size, decompress=True):
         print(f"Downloaded {github_file} to {save_location}")
         return True
     else:
-        print(f"Error downloading {github_file}: {response.status_code}")
+        print(f"Error downloading {github_file}.")
         return False
 
 
@@ -587,7 +722,9 @@ def handle_directory_tracking(settings, github_files):
 
     # Get files in the specified GitHub directory
     github_directory_files = [file for file in github_files if file.startswith(github_directory_path)]
-    print("The specified directory contains the following file(s): ")
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS) or {}
+    total_size = sum(snapshot[file][1] for file in github_directory_files if file in snapshot)
+    print(f"The specified directory contains the following file(s) ({total_size / 1000000:.2f} MB): ")
     for file in github_directory_files:
         if file in tracked_files:
             print(f"{file} [ALREADY TRACKED] (local copy: {tracked_files[file]})")
@@ -668,9 +805,13 @@ def handle_file_selection(settings, github_files):
 
 def add_github_file_to_tracking(settings):
     # Clean up tracking entries before proceeding
-    blacklist = ['.gitignore', '.idea/', 'build/', 'dist/', '.spec', '.py', '.ico']
+    blacklist = ['.gitignore', '.idea/', 'build/', 'dist/', '.spec', '.py', '.ico', chunk_store.chunk_folder,
+                 delta.delta_folder]
     blacklist.extend(settings['blacklist'])
-    github_files = list_github_files(settings, blacklist)
+    remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS, refresh=True)
+    # Chunked and delta-stored files are listed by their own name rather than their manifest's
+    github_files = [delta.logical_path(chunk_store.logical_path(file))
+                    for file in list_github_files(settings, blacklist)]
 
     if not github_files:
         print("No files available for tracking.")
@@ -685,11 +826,21 @@ def add_github_file_to_tracking(settings):
         handle_file_selection(settings, github_files)
 
 
+def get_tracking_entries(settings):
+    """Get every tracked file and directory as (GitHub path, local path, is a directory)."""
+    entries = [(github_file, local_file, False) for github_file, local_file in settings['files_to_track'].items()]
+    entries += [(root['github_folder'], root['local_root'], True) for root in state_db.get_tracked_roots()]
+    return entries
+
+
 def display_tracked_files(settings):
-    """Display currently tracked files."""
+    """Display currently tracked files and directories."""
     print("Currently tracked files:")
-    for idx, (github_file, local_file) in enumerate(settings['files_to_track'].items()):
-        print(f"{idx + 1}. {github_file} (Local copy: {local_file})")
+    for idx, (github_path, local_path, is_directory) in enumerate(get_tracking_entries(settings)):
+        if is_directory:
+            print(f"{idx + 1}. {github_path}/ [DIRECTORY] (Local copy: {local_path})")
+        else:
+            print(f"{idx + 1}. {github_path} (Local copy: {local_path})")
 
 
 def prompt_file_selection(num_files):
@@ -707,15 +858,20 @@ def prompt_file_selection(num_files):
 
 def remove_file_from_tracking(settings):
     """Remove a file from tracking without deleting it from GitHub."""
-    if 'files_to_track' not in settings or not settings['files_to_track']:
+    entries = get_tracking_entries(settings)
+    if not entries:
         print("No files are currently being tracked.")
         return
 
     display_tracked_files(settings)
 
-    selection_index = prompt_file_selection(len(settings['files_to_track']))
-    github_file = list(settings['files_to_track'].keys())[selection_index]
-    local_file = settings['files_to_track'][github_file]
+    selection_index = prompt_file_selection(len(entries))
+    github_file, local_file, is_directory = entries[selection_index]
+
+    if is_directory:
+        state_db.remove_tracked_root(github_file)
+        print(f"Removed {github_file}/ from tracking. Local copy was at {local_file}.")
+        return
 
     # Remove from tracking
     del settings['files_to_track'][github_file]
@@ -723,16 +879,44 @@ def remove_file_from_tracking(settings):
     print(f"Removed {github_file} from tracking. Local copy was at {local_file}.")
 
 
+def remove_directory_from_github_and_tracking(github_folder):
+    """Remove a tracked directory and everything under its GitHub folder in one commit."""
+    state_db.remove_tracked_root(github_folder)
+    print(f"Removed {github_folder}/ from tracking.")
+
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS, refresh=True)
+    if snapshot is None:
+        print("Failed to fetch file information from GitHub.")
+        return
+    prefix = github_folder + '/'
+    for github_path in [path for path in snapshot if path.startswith(prefix)]:
+        if github_path.endswith(delta.manifest_suffix):
+            # Delta-stored files are removed along with their base and patches
+            delta.queue_delete_stored(GITHUB_REPO, HEADERS, delta.logical_path(github_path))
+        else:
+            batch_commit.queue_delete(github_path)
+    if not batch_commit.has_pending_changes():
+        print(f"{github_folder}/ was not found on GitHub.")
+    elif batch_commit.flush_pending_changes(GITHUB_REPO, HEADERS, f"Delete {github_folder} via script"):
+        print(f"Successfully removed {github_folder}/ from GitHub.")
+    else:
+        print(f"Failed to remove {github_folder}/ from GitHub.")
+
+
 def remove_file_from_github_and_tracking(settings):
     """Remove a file from GitHub and tracking."""
-    if 'files_to_track' not in settings or not settings['files_to_track']:
+    entries = get_tracking_entries(settings)
+    if not entries:
         print("No files are currently being tracked.")
         return
 
     display_tracked_files(settings)
 
-    selection_index = prompt_file_selection(len(settings['files_to_track']))
-    github_file = list(settings['files_to_track'].keys())[selection_index]
+    selection_index = prompt_file_selection(len(entries))
+    github_file, _, is_directory = entries[selection_index]
+    if is_directory:
+        remove_directory_from_github_and_tracking(github_file)
+        return
 
     # Remove from tracking
     del settings['files_to_track'][github_file]
@@ -740,28 +924,43 @@ def remove_file_from_github_and_tracking(settings):
     print(f"Removed {github_file} from tracking.")
 
     # Get the SHA of the file to delete from GitHub
-    url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{github_file}"
-    response = requests.get(url, headers=HEADERS)
+    snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS, refresh=True)
 
-    if response.status_code == 200:
-        file_info = response.json()
-        sha = file_info['sha']
+    if snapshot is not None and delta.is_delta_on_github(snapshot, github_file):
+        # Delta-stored files are removed along with their base and patches, which no other file uses
+        delta.queue_delete_stored(GITHUB_REPO, HEADERS, github_file)
+        if batch_commit.flush_pending_changes(GITHUB_REPO, HEADERS, f"Delete {github_file} via script"):
+            print(f"Successfully removed {github_file} from GitHub.")
+        else:
+            print(f"Failed to remove {github_file} from GitHub.")
+        return
+
+    github_path = github_file
+    if snapshot is not None and chunk_store.is_chunked_on_github(snapshot, github_file):
+        # Chunked files are removed by deleting their manifest, their chunks may be shared with other files
+        github_path = chunk_store.manifest_path(github_file)
+
+    if snapshot is not None and github_path in snapshot:
+        sha = snapshot[github_path][0]
 
         # Now we can delete the file
-        delete_url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{github_file}"
+        delete_url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/{github_path}"
         data = {
             "message": f"Delete {github_file} via script",
             "sha": sha
         }
-        delete_response = requests.delete(delete_url, headers=HEADERS, json=data)
+        delete_response = github_client.delete(delete_url, headers=HEADERS, json=data)
 
         if delete_response.status_code == 200:
+            remote_snapshot.remove_from_remote_snapshot(github_path)
             print(f"Successfully removed {github_file} from GitHub.")
         else:
             print(
                 f"Failed to remove {github_file} from GitHub: {delete_response.status_code} - {delete_response.json()}")
+    elif snapshot is None:
+        print("Failed to fetch file information from GitHub.")
     else:
-        print(f"Failed to fetch file information from GitHub: {response.status_code} - {response.json()}")
+        print(f"{github_file} was not found on GitHub.")
 
 
 def check_and_launch_background_process():
@@ -770,7 +969,7 @@ def check_and_launch_background_process():
     app_exe_path = os.path.join(app_dir, process_name)
     print(f"Checking if {process_name} is currently running.")
     # Check if the process is running
-    game_running = any(process.name() == process_name for process in psutil.process_iter())
+    game_running = process_name.casefold() in process_monitor.snapshot_process_names()
     if game_running:
         print(f"{process_name} is already running.")
     else:
@@ -783,6 +982,22 @@ def check_and_launch_background_process():
             print(f"Failed to launch {process_name}: {e}")
 
 
+# Function to record this version next to the exe for the launcher, if it isn't already
+def write_version_file():
+    version_path = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), version_file_name)
+    try:
+        with open(version_path, 'r') as f:
+            if f.read().strip() == f"v{__version__}":
+                return
+    except OSError:
+        pass
+    try:
+        with open(version_path, 'w') as f:
+            f.write(f"v{__version__}")
+    except OSError as e:
+        logging.warning(f"Could not write {version_path}: {e}")
+
+
 def add_to_blacklist(settings):
     print(f"Current Blacklist: {settings['blacklist']}")
     while True:
@@ -846,90 +1061,22 @@ def remove_from_process_watchlist(settings):
             print("Invalid input. Please enter a valid number.")
 
 
-def extract_app_name_from_path(executable_path):
-    directory = os.path.dirname(executable_path)
-    file_name = os.path.basename(executable_path)
-    folder_name = os.path.basename(directory)
-
-    non_descriptive_folders = ["bin", "debug", "release", "distribution", "thirdparty", "Binaries", "Win64",
-                               "binaries", "win64", "usermods", "Redistributables", "en-us", "Engine",
-                               "Extras", "redist", "Redist", "vcred", "VCRed", "Support", "support",
-                               "VS2010Runtime", "VS2012Runtime", "VS2015Runtime", "VS2017Runtime"]
-
-    if folder_name.lower() in non_descriptive_folders:
-        parent_directory = os.path.dirname(directory)
-        app_name = os.path.basename(parent_directory)
-        if app_name.lower() in non_descriptive_folders:
-            grandparent_directory = os.path.dirname(parent_directory)
-            app_name = os.path.basename(grandparent_directory)
-    else:
-        app_name = folder_name
-
-    app_name = clean_app_name(app_name, file_name)
-    return f"{app_name} - {file_name}" if app_name else file_name
-
-
-def clean_app_name(app_name, file_name):
-    app_name = re.sub(r'^(installer|launcher|service|setup|client|app|application)', '', app_name,
-                      flags=re.IGNORECASE).strip()
-    app_name = re.sub(r'[\s_-]+', ' ', app_name).strip()
-    return app_name or file_name
-
-
 def get_installed_apps(search_paths=None, blacklist=None):
-    if blacklist is None:
-        blacklist = []
-
     installed_apps = {}
     if search_paths:
-        for path in search_paths:
-            installed_apps.update(find_executables_in_path(path, blacklist))
+        installed_apps = exe_index.find_executables(search_paths, blacklist)
     return installed_apps
 
 
-def find_executables_in_path(path, blacklist=None):
-    if blacklist is None:
-        blacklist = []
-
-    executables = {}
-    for root, dirs, files in os.walk(path):
-        for file in files:
-            if not any(word in file for word in blacklist):
-                if file.endswith('.exe'):
-                    full_path = os.path.join(root, file)
-                    app_name = extract_app_name_from_path(full_path)
-                    special_name = app_name
-                    executables[special_name] = file
-    return executables
-
-
+# Function to get the list of known game processes, served from the saved copy and refreshed in the background
 def fetch_game_processes():
-    url = f"https://api.github.com/repos/{GITHUB_REPO}/contents/process-list.json"
-    response = requests.get(url)
-
-    if response.status_code == 200:
-        content_base64 = response.json().get('content', '')
-        if content_base64:
-            content_json = base64.b64decode(content_base64).decode('utf-8')
-            return json.loads(content_json)
-        else:
-            print("No content found in the file")
-            return {}
-    else:
-        print("Failed to fetch game processes")
-        return {}
+    return process_catalogue.get_catalogue(GITHUB_REPO)
 
 
-def search_game_process(game_name, game_process_list):
-    game_name = game_name.lower().strip()
-    matched_processes = {}
-
-    for game, process in game_process_list.items():
-        normalized_game_name = game.lower().strip()
-        if game_name in normalized_game_name:
-            matched_processes[game] = process
-
-    return matched_processes
+# Function to find the closest matches to a game name, best first. The search index is only built again when the
+# list changes, so repeated searches in a session are instant.
+def search_game_process(game_name, game_process_list, limit=process_search.default_limit):
+    return process_search.get_search_index(game_process_list).search(game_name, limit)
 
 
 def show_game_selection(matched_games):
@@ -962,7 +1109,7 @@ def add_to_process_watchlist(settings):
     print("Searching user-specified paths...")
     installed_apps = get_installed_apps(search_paths, blacklist)
 
-    print("Fetching processes from GitHub...")
+    print("Loading the process list...")
     github_processes = fetch_game_processes()
 
     # Combine installed apps and GitHub processes
@@ -987,37 +1134,86 @@ def add_to_process_watchlist(settings):
 
 def check_files(settings):
     # Check if files_to_track is empty
-    if not settings['files_to_track']:
+    if not settings['files_to_track'] and not state_db.get_tracked_roots():
         print("No files are currently being tracked.")
     else:
+        hash_cache.reset_cache_stats()
+        github_client.reset_stats()
+        snapshot = remote_snapshot.get_remote_snapshot(GITHUB_REPO, HEADERS, refresh=True)
+        tracked = [(key, value, False) for key, value in settings['files_to_track'].items()]
+        # Tracked directories are expanded into the files they contain now, so new files are picked up
+        root_files = directory_walker.expand_tracked_roots(snapshot, skip=settings['files_to_track'])
+        tracked += [(key, value, True) for key, value in root_files.items()]
         keys_to_remove = []  # List to collect keys to remove
-        for key in list(settings['files_to_track'].keys()):  # Use list() to avoid modifying while iterating
+        for key, value, from_root in tracked:
             print()
             print(f"Checking file: {key}...")
-            time.sleep(1)
+            if not from_root:
+                time.sleep(1)
             print()
-            value = settings['files_to_track'][key]
-            if not compare_files(key, value):  # If compare_files indicates removal
+            # If compare_files indicates removal
+            if not compare_files(settings, key, value, settings['compare_mode'], from_root):
                 keys_to_remove.append(key)
+                state_db.record_sync(key, 'check', 'removed')
         # Now remove the collected keys after the iteration is done
         for key in keys_to_remove:
             del settings['files_to_track'][key]
         save_settings(settings)  # Save settings after all removals
-
-
-def adjust_background_app_sleep_times(settings, setting_to_edit):
+        committed = set()
+        if batch_commit.has_pending_changes():
+            print("Uploading queued files to GitHub...")
+            committed = batch_commit.flush_pending_changes(GITHUB_REPO, HEADERS)
+        for github_file in queued_uploads:
+            # Chunked and delta-stored files are committed as their manifest
+            stored = {github_file, chunk_store.manifest_path(github_file), delta.manifest_path(github_file)}
+            state_db.record_sync(github_file, 'upload', 'uploaded' if committed & stored else 'failed')
+        queued_uploads.clear()
+        hash_cache.save_hash_cache()
+        github_client.save_response_cache()
+        file_compression.save_content_hashes()
+        print_and_log(hash_cache.cache_stats_message(), logging.info)
+        print_and_log(github_client.stats_message(), logging.info)
+
+
+def adjust_background_app_sleep_times(settings, setting_to_edit, unit="minutes"):
     if not settings[setting_to_edit]:
         print("No time currently set.")
     else:
-        print(f"Current sleep time for {setting_to_edit} is set to: {settings[setting_to_edit]} minutes")
-        new_time = specific_input("Enter the new sleep time in minutes (or type 'menu' to go back): ",
+        print(f"Current sleep time for {setting_to_edit} is set to: {settings[setting_to_edit]} {unit}")
+        new_time = specific_input(f"Enter the new sleep time in {unit} (or type 'menu' to go back): ",
                                   None, int, ['menu', 'm'])
         if new_time == "menu" or new_time == "m":
             return
         else:
             settings[setting_to_edit] = new_time
             save_settings(settings)
-            print(f"Succesfully update {setting_to_edit} to {new_time} minutes.")
+            print(f"Succesfully update {setting_to_edit} to {new_time} {unit}.")
+
+
+# Function to choose how a GitHub file, or every file in a GitHub folder, is stored
+def configure_file_storage(settings):
+    print(f"Current file options: {settings['file_options']}")
+    github_path = input("Enter the GitHub file or folder path (or type 'menu' to go back): ").strip().strip('/')
+    if github_path == "menu" or not github_path:
+        return
+    print("Storage modes: 'plain' keeps a full copy per version, 'chunked' splits the file into chunks so only the "
+          "changed parts are uploaded, 'delta' uploads a patch against the last synced version (a new full copy is "
+          f"stored every {delta.compact_after} patches).")
+    storage = specific_input(f"Storage mode for {github_path} ({'/'.join(file_options.storage_modes)}): ",
+                             file_options.storage_modes + ['menu', 'm'], exit_text=['menu', 'm'])
+    if storage == "menu" or storage == "m":
+        return
+    print("Compression: 'zlib' always works, 'zstd' is faster and smaller but falls back to zlib if the 'zstandard' "
+          "package isn't installed. Files that are already compressed are stored as they are.")
+    compression = specific_input(f"Compression for {github_path} ({'/'.join(file_options.compression_modes)}): ",
+                                 file_options.compression_modes + ['menu', 'm'], exit_text=['menu', 'm'])
+    if compression == "menu" or compression == "m":
+        return
+    file_options.set_file_option(settings, github_path, 'storage', storage)
+    file_options.set_file_option(settings, github_path, 'compression', compression)
+    save_settings(settings)
+    print_and_log(f"Files under '{github_path}' will use '{storage}' storage with '{compression}' compression from "
+                  f"their next upload.", logging.info)
 
 
 def toggle_show_console_if_input_required(settings):
@@ -1034,6 +1230,27 @@ def toggle_show_console_if_input_required(settings):
                       logging.info)
 
 
+def toggle_compare_mode(settings):
+    if 'compare_mode' not in settings:
+        print_and_log("'compare_mode' not found in the settings file.", logging.error)
+    else:
+        if settings['compare_mode'] == 'blob_sha':
+            settings['compare_mode'] = 'content'
+        else:
+            settings['compare_mode'] = 'blob_sha'
+        save_settings(settings)
+        print_and_log(f"'compare_mode' setting updated to: [{settings['compare_mode']}]", logging.info)
+
+
+def toggle_watch_for_changes(settings):
+    if 'watch_for_changes' not in settings:
+        print_and_log("'watch_for_changes' not found in the settings file.", logging.error)
+    else:
+        settings['watch_for_changes'] = not bool(settings['watch_for_changes'])
+        save_settings(settings)
+        print_and_log(f"'watch_for_changes' setting updated to: [{settings['watch_for_changes']}]", logging.info)
+
+
 # Main program function
 def main():
     if "--version" in sys.argv:
@@ -1044,6 +1261,7 @@ def main():
     else:
         print_and_log("Offline Mode", logging.info)
     print_and_log(f"Running application version v{__version__}", logging.info)
+    write_version_file()
     check_and_launch_background_process()
     time.sleep(2)
     try:
@@ -1077,8 +1295,11 @@ def main():
                                                ("   5)", "cyan"), (" Remove file from Local & GitHub tracking.\n",
                                                                    "reset"),
                                                ("   6)", "lightred_ex"), (" Configure search Blacklist.\n", "reset"),
+                                               ("   7)", "lightgreen_ex"),
+                                               (" Configure storage for a file or folder.\n", "reset"),
                                                ("   m)", "yellow"), (" Return to Main Menu.", "reset")])
-                sub_answer = specific_input("   (1/2/3/4/5/6/menu): ", ["1", "2", "3", "4", "5", "6", "m", "menu"])
+                sub_answer = specific_input("   (1/2/3/4/5/6/7/menu): ",
+                                            ["1", "2", "3", "4", "5", "6", "7", "m", "menu"])
                 if sub_answer == "m" or sub_answer == "menu":
                     print("Returning to Main Menu...")
                 elif sub_answer == "1":
@@ -1102,6 +1323,8 @@ def main():
                         add_to_blacklist(settings)
                     elif sub_menu_answer == "2":
                         remove_from_blacklist(settings)
+                elif sub_answer == "7":
+                    configure_file_storage(settings)
             elif answer == "2":
                 print_in_multi_colour_and_log([("   1)", "red"), (" Create entry in Process Watchlist.\n", "reset"),
                                                ("   2)", "green"), (" Remove entry in Process Watchlist.\n", "reset"),
@@ -1119,7 +1342,7 @@ def main():
                 elif sub_answer == "3":
                     adjust_background_app_sleep_times(settings, 'file_check_interval')
                 elif sub_answer == "4":
-                    adjust_background_app_sleep_times(settings, 'game_check_interval')
+                    adjust_background_app_sleep_times(settings, 'process_check_interval', "seconds")
             elif answer == "3":
                 while True:
                     print_in_multi_colour_and_log([("   1)", "red"),
@@ -1128,8 +1351,15 @@ def main():
                                                    ("   2)", "green"), (" View Tracked Files.\n", "reset"),
                                                    ("   3)", "blue"), (" View Process Watchlist.\n", "reset"),
                                                    ("   4)", "magenta"), (" View Blacklist.\n", "reset"),
+                                                   ("   5)", "cyan"),
+                                                   (f" Toggle file comparison mode (blob_sha avoids downloads). "
+                                                    f"Currently: [{settings['compare_mode']}]\n", "reset"),
+                                                   ("   6)", "lightred_ex"),
+                                                   (f" Toggle checking files as soon as they change. "
+                                                    f"Currently: [{settings['watch_for_changes']}]\n", "reset"),
                                                    ("   m)", "yellow"), (" Return to Main Menu.", "reset")])
-                    sub_answer = specific_input("     (1/2/3/4/menu): ", ["1", "2", "3", "4", "m", "menu"])
+                    sub_answer = specific_input("     (1/2/3/4/5/6/menu): ",
+                                                ["1", "2", "3", "4", "5", "6", "m", "menu"])
                     print()
                     if sub_answer == "m" or sub_answer == "menu":
                         print("Returning to Main Menu...")
@@ -1141,6 +1371,9 @@ def main():
                             print_and_log("'files_to_track' not found in the settings file.", logging.error)
                         else:
                             print_and_log(f"Currently tracked files: {settings['files_to_track']}", logging.info)
+                            for root in state_db.get_tracked_roots():
+                                print_and_log(f"Tracked directory: {root['github_folder']}/ -> {root['local_root']} "
+                                              f"(excluding {root['patterns'] or 'nothing'})", logging.info)
                     elif sub_answer == "3":
                         if 'process_watchlist' not in settings:
                             print_and_log("'process_watchlist' not found in the settings file.", logging.error)
@@ -1151,6 +1384,10 @@ def main():
                             print_and_log("'blacklist' not found in the settings file.", logging.error)
                         else:
                             print_and_log(f"Current Blacklist: {settings['blacklist']}", logging.info)
+                    elif sub_answer == "5":
+                        toggle_compare_mode(settings)
+                    elif sub_answer == "6":
+                        toggle_watch_for_changes(settings)
                     print()
             time.sleep(2)
     except Exception as e:
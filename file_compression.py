@@ -0,0 +1,250 @@
+import atexit
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+import zlib
+
+import github_client
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # zstd is optional, zlib is used instead when it isn't installed
+
+# Variable Declaration
+magic = b'FBZ1'
+algorithm_ids = {'zlib': 1, 'zstd': 2}
+header_size = len(magic) + 1 + 32  # magic, algorithm, SHA-256 of the uncompressed content
+chunk_size = 1024 * 1024
+sample_size = 64 * 1024  # bytes looked at to guess if a file is worth compressing
+entropy_threshold = 7.5  # bits per byte, data above this is treated as already compressed
+min_saving = 0.05  # keep the plain copy unless compression saves at least this share of the size
+zlib_level = 6
+zstd_level = 10
+content_hash_file = 'compressed_hashes.json'
+
+# Signatures of formats that are already compressed, compressing them again only costs time
+compressed_signatures = (
+    magic,
+    b'\x1f\x8b',  # gzip
+    b'PK\x03\x04',  # zip (and docx, jar, ...)
+    b'7z\xbc\xaf\x27\x1c',  # 7z
+    b'Rar!',  # rar
+    b'\x28\xb5\x2f\xfd',  # zstd
+    b'\xfd7zXZ\x00',  # xz
+    b'BZh',  # bzip2
+    b'\x89PNG',  # png
+    b'\xff\xd8\xff',  # jpeg
+    b'OggS',  # ogg
+    b'fLaC',  # flac
+    b'ID3',  # mp3
+)
+
+decompression_errors = (zlib.error, zstandard.ZstdError) if zstandard is not None else (zlib.error,)
+
+_content_hashes = None  # stored blob SHA -> SHA-256 of its uncompressed content, or None if it isn't compressed
+_content_hashes_lock = threading.Lock()
+_content_hashes_dirty = False
+
+
+# Function to get the algorithm to use, falling back to zlib if zstd isn't installed
+def available_algorithm(algorithm):
+    if algorithm == 'zstd' and zstandard is None:
+        return 'zlib'
+    return algorithm
+
+
+# Function to work out the Shannon entropy of a sample in bits per byte
+def _entropy(sample):
+    if not sample:
+        return 0.0
+    counts = [0] * 256
+    for byte in sample:
+        counts[byte] += 1
+    total = len(sample)
+    return -sum(count / total * math.log2(count / total) for count in counts if count)
+
+
+# Function to guess from the start of some data whether it is already compressed
+def looks_compressed(sample):
+    return sample.startswith(compressed_signatures) or _entropy(sample[:sample_size]) > entropy_threshold
+
+
+def _compressor(algorithm):
+    if algorithm == 'zstd':
+        return zstandard.ZstdCompressor(level=zstd_level).compressobj()
+    return zlib.compressobj(zlib_level)
+
+
+def _decompressor(algorithm_id):
+    if algorithm_id == algorithm_ids['zstd']:
+        if zstandard is None:
+            raise ValueError("zstd compressed content needs the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompressobj()
+    if algorithm_id == algorithm_ids['zlib']:
+        return zlib.decompressobj()
+    raise ValueError(f"Unknown compression algorithm {algorithm_id}")
+
+
+# Function to read the header of compressed content, returning (algorithm id, SHA-256) or None if it isn't compressed
+def parse_header(data):
+    if len(data) < header_size or not data.startswith(magic):
+        return None
+    return data[len(magic)], data[len(magic) + 1:header_size].hex()
+
+
+# Function to compress a file into a temporary file, returning (temp path, SHA-256 of the content) or None if the
+# file looks already compressed or doesn't get meaningfully smaller
+def compress_file(local_file, algorithm):
+    algorithm = available_algorithm(algorithm)
+    with open(local_file, 'rb') as f:
+        if looks_compressed(f.read(sample_size)):
+            return None
+        f.seek(0)
+        size = os.fstat(f.fileno()).st_size
+
+        temp_fd, temp_path = tempfile.mkstemp(suffix=".fbz")
+        try:
+            hasher = hashlib.sha256()
+            compressor = _compressor(algorithm)
+            with os.fdopen(temp_fd, 'wb') as temp_file:
+                # The content hash is only known at the end, so it is filled into the header afterwards
+                temp_file.write(magic + bytes([algorithm_ids[algorithm]]) + bytes(32))
+                while chunk := f.read(chunk_size):
+                    hasher.update(chunk)
+                    temp_file.write(compressor.compress(chunk))
+                temp_file.write(compressor.flush())
+                compressed_size = temp_file.tell()
+                temp_file.seek(len(magic) + 1)
+                temp_file.write(hasher.digest())
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    if compressed_size > size * (1 - min_saving):
+        os.remove(temp_path)
+        return None
+    return temp_path, hasher.hexdigest()
+
+
+# Function to compress content held in memory, returning it unchanged if compression doesn't help
+def compress_bytes(content, algorithm):
+    algorithm = available_algorithm(algorithm)
+    if looks_compressed(content[:sample_size]):
+        return content
+    compressor = _compressor(algorithm)
+    compressed = compressor.compress(content) + compressor.flush()
+    header = magic + bytes([algorithm_ids[algorithm]]) + hashlib.sha256(content).digest()
+    if len(header) + len(compressed) > len(content) * (1 - min_saving):
+        return content
+    return header + compressed
+
+
+# Function to undo compress_bytes, content without a header is returned as it is
+def decompress_bytes(data):
+    header = parse_header(data)
+    if header is None:
+        return data
+    algorithm_id, content_hash = header
+    try:
+        content = _decompressor(algorithm_id).decompress(data[header_size:])
+    except decompression_errors as e:
+        raise ValueError(f"Compressed content is corrupt: {e}") from e
+    if hashlib.sha256(content).hexdigest() != content_hash:
+        raise ValueError("Decompressed content does not match the hash in its header")
+    return content
+
+
+# Function to check if a file on disk was written by compress_file
+def is_compressed_file(path):
+    with open(path, 'rb') as f:
+        return parse_header(f.read(header_size)) is not None
+
+
+# Function to expand a compressed file into target_path, returning False if it is corrupt or doesn't match its
+# header's hash
+def decompress_file(source_path, target_path):
+    with open(source_path, 'rb') as source:
+        algorithm_id, content_hash = parse_header(source.read(header_size))
+        hasher = hashlib.sha256()
+        with open(target_path, 'wb') as target:
+            try:
+                decompressor = _decompressor(algorithm_id)
+                while chunk := source.read(chunk_size):
+                    content = decompressor.decompress(chunk)
+                    hasher.update(content)
+                    target.write(content)
+                content = decompressor.flush()
+            except (ValueError, *decompression_errors) as e:
+                print(f"Could not decompress {source_path}: {e}")
+                return False
+            hasher.update(content)
+            target.write(content)
+            target.flush()
+            os.fsync(target.fileno())
+    return hasher.hexdigest() == content_hash
+
+
+# Function to load the known content hashes of stored blobs (only done once per process)
+def _load_content_hashes():
+    global _content_hashes
+    if _content_hashes is None:
+        _content_hashes = {}
+        if os.path.exists(content_hash_file):
+            try:
+                with open(content_hash_file, 'r') as f:
+                    _content_hashes = json.load(f)
+            except (OSError, ValueError):
+                _content_hashes = {}
+    return _content_hashes
+
+
+# Function to write the known content hashes back to disk
+def save_content_hashes():
+    global _content_hashes_dirty
+    with _content_hashes_lock:
+        if _content_hashes is None or not _content_hashes_dirty:
+            return
+        temp_file = content_hash_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(_content_hashes, f)
+        os.replace(temp_file, content_hash_file)
+        _content_hashes_dirty = False
+
+
+atexit.register(save_content_hashes)
+
+
+# Function to remember the content hash of a stored blob, blobs never change so this never has to be looked up again
+def remember_content_hash(blob_sha, content_hash):
+    global _content_hashes_dirty
+    with _content_hashes_lock:
+        _load_content_hashes()[blob_sha] = content_hash
+        _content_hashes_dirty = True
+
+
+# Function to get the SHA-256 of the uncompressed content of a file on GitHub, or None if it isn't compressed.
+# Only the header is downloaded, and only the first time a blob is seen.
+def remote_content_hash(url, headers, blob_sha, blob_size=None):
+    with _content_hashes_lock:
+        known = _load_content_hashes()
+        if blob_sha in known:
+            return known[blob_sha]
+    response = github_client.get(url, headers={**headers, 'Range': f"bytes=0-{header_size - 1}"}, stream=True)
+    try:
+        if response.status_code not in (200, 206):
+            raise OSError(f"Error fetching the header of {url}: {response.status_code}")
+        data = next(response.iter_content(chunk_size=header_size), b"")
+        total_size = response.headers.get('Content-Range', '').rpartition('/')[2] or \
+            response.headers.get('Content-Length')
+    finally:
+        response.close()
+    header = parse_header(data[:header_size])
+    content_hash = header[1] if header is not None else None
+    # raw.githubusercontent.com can briefly serve an older version, only remember the answer if the size matches
+    if blob_size is None or str(blob_size) == total_size:
+        remember_content_hash(blob_sha, content_hash)
+    return content_hash
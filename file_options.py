@@ -0,0 +1,21 @@
+# Variable Declaration
+default_options = {"storage": "plain", "compression": "none"}
+storage_modes = ["plain", "chunked", "delta"]
+compression_modes = ["none", "zlib", "zstd"]
+
+
+# Function to get the options for a tracked GitHub file. Options can be set for the file itself or any folder it is
+# in (stored under 'file_options' in the settings), the most specific entry wins.
+def get_file_options(settings, github_file):
+    options = dict(default_options)
+    file_options = settings.get('file_options', {})
+    matches = [key for key in file_options
+               if key == github_file or github_file.startswith(key.rstrip('/') + '/')]
+    for key in sorted(matches, key=len):
+        options.update(file_options[key])
+    return options
+
+
+# Function to set an option for a GitHub file or folder
+def set_file_option(settings, github_path, option, value):
+    settings.setdefault('file_options', {}).setdefault(github_path, {})[option] = value
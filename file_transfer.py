@@ -0,0 +1,153 @@
+import base64
+import hashlib
+import json
+import os
+import tempfile
+
+import file_compression
+import github_client
+
+# Variable Declaration
+chunk_size = 1024 * 1024  # bytes held in memory at once while transferring
+base64_read_size = chunk_size - chunk_size % 3  # multiple of 3 so each chunk encodes without padding
+
+
+# A JSON request body holding a file as base64 under content_key, which reads and encodes the file a chunk at a
+# time as it is sent instead of building the whole body in memory
+class Base64JsonBody:
+    def __init__(self, local_file, fields, content_key="content"):
+        self.local_file = local_file
+        self.size = os.path.getsize(local_file)
+        prefix = json.dumps(fields)[:-1] + (", " if fields else "") + json.dumps(content_key) + ': "'
+        self.prefix = prefix.encode('utf-8')
+        self.suffix = b'"}'
+        self.length = len(self.prefix) + 4 * ((self.size + 2) // 3) + len(self.suffix)
+        self._file = None
+        self._buffer = b""
+        self._position = 0  # how much of the buffer has been sent
+        self._remaining = 0
+        self._stage = 'prefix'
+
+    def __len__(self):
+        return self.length
+
+    # Rewind so the body can be sent again if the request is retried
+    def seek(self, offset, whence=0):
+        if offset != 0 or whence != 0:
+            raise ValueError("Base64JsonBody can only be rewound to the start")
+        self.close()
+        self._buffer = b""
+        self._position = 0
+        self._stage = 'prefix'
+        return 0
+
+    def _next_piece(self):
+        if self._stage == 'prefix':
+            self._file = open(self.local_file, 'rb')
+            self._remaining = self.size
+            self._stage = 'content'
+            return self.prefix
+        if self._stage == 'content':
+            chunk = self._file.read(min(base64_read_size, self._remaining))
+            if chunk:
+                self._remaining -= len(chunk)
+                return base64.b64encode(chunk)
+            self.close()
+            self._stage = 'suffix'
+        if self._stage == 'suffix':
+            self._stage = 'done'
+            return self.suffix
+        return b""
+
+    def read(self, size=-1):
+        # Only one encoded chunk is kept, and it is only copied once it has been sent
+        while (size < 0 or len(self._buffer) - self._position < size) and self._stage != 'done':
+            self._buffer = self._buffer[self._position:] + self._next_piece()
+            self._position = 0
+        if size < 0:
+            size = len(self._buffer) - self._position
+        data = self._buffer[self._position:self._position + size]
+        self._position += len(data)
+        return data
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Function to describe how fast a transfer was
+def throughput_message(size, seconds):
+    megabytes = size / 1000000
+    return f"{megabytes:.2f} MB in {seconds:.1f}s ({megabytes / max(seconds, 0.001):.2f} MB/s)"
+
+
+# Function to flush a directory entry to disk so a rename into it survives a crash (not possible on Windows)
+def fsync_directory(directory):
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Function to stream a URL into a file, replacing it only once the download is complete and verified.
+# expected_sha is the git blob SHA-1 and expected_size the size GitHub reports for the file, if known. With
+# decompress set, content that was uploaded compressed is expanded before it replaces the file.
+def download_to_file(url, headers, save_location, expected_sha=None, expected_size=None, decompress=False):
+    directory = os.path.dirname(os.path.abspath(save_location))
+    response = github_client.get(url, headers=headers, stream=True)
+    if response.status_code != 200:
+        print(f"Error downloading {url}: {response.status_code}")
+        response.close()
+        return False
+
+    # Write to a temporary file next to the target, so the final rename never crosses file systems
+    temp_fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(save_location)}.",
+                                          suffix=".part")
+    try:
+        blob_hasher = hashlib.sha1(f"blob {expected_size}\0".encode()) if expected_size is not None else None
+        bytes_written = 0
+        with os.fdopen(temp_fd, 'wb') as temp_file:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                temp_file.write(chunk)
+                if blob_hasher is not None:
+                    blob_hasher.update(chunk)
+                bytes_written += len(chunk)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+
+        if expected_size is not None and bytes_written != expected_size:
+            print(f"Download of {url} was incomplete ({bytes_written} of {expected_size} bytes).")
+            os.remove(temp_path)
+            return False
+        if expected_sha is not None and blob_hasher is not None and blob_hasher.hexdigest() != expected_sha:
+            print(f"Downloaded content of {url} does not match the expected SHA, the file may have changed on GitHub.")
+            os.remove(temp_path)
+            return False
+
+        if decompress and file_compression.is_compressed_file(temp_path):
+            compressed_path = temp_path
+            temp_fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(save_location)}.",
+                                                  suffix=".part")
+            os.close(temp_fd)
+            try:
+                expanded = file_compression.decompress_file(compressed_path, temp_path)
+            finally:
+                os.remove(compressed_path)
+            if not expanded:
+                print(f"Decompressed content of {url} does not match the hash it was uploaded with.")
+                os.remove(temp_path)
+                return False
+
+        os.replace(temp_path, save_location)
+        fsync_directory(directory)
+        return True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        response.close()
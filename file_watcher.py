@@ -0,0 +1,201 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# Variable Declaration
+poll_interval = 5  # seconds between stats when inotify isn't available
+debounce_seconds = 2  # wait for writes to settle before reporting a change
+max_debounce_seconds = 30  # report anyway if a file keeps being written for this long
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+_tracked_files = frozenset()  # normalised paths of every tracked file, replaced rather than changed
+_changed_files = set()
+_last_change_time = 0.0
+_changes_condition = threading.Condition()
+_watcher_thread = None
+backend = None
+
+_libc = None
+_inotify_fd = None
+_watch_descriptors = {}  # directory -> wd
+_watched_directories = {}  # wd -> directory
+_watches_lock = threading.Lock()  # the watches are changed by the caller of watch_files and read by the watcher
+_poll_fingerprints = {}
+
+
+# Function to normalise a path so paths from events and settings can be compared
+def normalise_path(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+# Function to set up inotify, returning False if it isn't available on this system
+def _init_inotify():
+    global _libc, _inotify_fd
+    if not sys.platform.startswith('linux'):
+        return False
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return False
+    if fd < 0:
+        return False
+    _inotify_fd = fd
+    return True
+
+
+# Function to watch the parent directories of the tracked files (files themselves may be replaced on save)
+def _update_inotify_watches():
+    directories = {os.path.dirname(path) for path in _tracked_files}
+    with _watches_lock:
+        for directory in directories - set(_watch_descriptors):
+            wd = _libc.inotify_add_watch(_inotify_fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                logging.warning(f"Could not watch {directory} for changes (errno {ctypes.get_errno()}).")
+                continue
+            _watch_descriptors[directory] = wd
+            _watched_directories[wd] = directory
+        for directory in set(_watch_descriptors) - directories:
+            wd = _watch_descriptors.pop(directory)
+            _watched_directories.pop(wd, None)
+            _libc.inotify_rm_watch(_inotify_fd, wd)
+
+
+# Function to read a batch of inotify events and queue the tracked files they touch
+def _read_inotify_events():
+    readable, _, _ = select.select([_inotify_fd], [], [], 1)
+    if not readable:
+        return
+    try:
+        data = os.read(_inotify_fd, 64 * 1024)
+    except BlockingIOError:
+        return
+
+    changed = set()
+    offset = 0
+    while offset < len(data):
+        wd, mask, _, name_length = EVENT_HEADER.unpack_from(data, offset)
+        name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + name_length].rstrip(b'\0')
+        offset += EVENT_HEADER.size + name_length
+
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost, so treat everything as changed
+            changed.update(_tracked_files)
+        elif mask & IN_IGNORED:
+            with _watches_lock:
+                directory = _watched_directories.pop(wd, None)
+                _watch_descriptors.pop(directory, None)
+        elif name:
+            with _watches_lock:
+                directory = _watched_directories.get(wd)
+            if directory is not None:
+                path = normalise_path(os.path.join(directory, os.fsdecode(name)))
+                if path in _tracked_files:
+                    changed.add(path)
+    _queue_changes(changed)
+
+
+# Function to keep reading inotify events, one bad batch is logged rather than stopping the watcher
+def _inotify_loop():
+    while True:
+        try:
+            _read_inotify_events()
+        except Exception as e:
+            logging.exception(f"Error reading file change events: {e}")
+            time.sleep(poll_interval)
+
+
+# Function to get what is needed to tell if a file changed without reading it
+def _poll_fingerprint(path):
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+
+# Function to stat every tracked file on an interval, used when inotify isn't available
+def _polling_loop():
+    while True:
+        time.sleep(poll_interval)
+        changed = set()
+        for path in list(_tracked_files):
+            fingerprint = _poll_fingerprint(path)
+            if path in _poll_fingerprints and _poll_fingerprints[path] != fingerprint:
+                changed.add(path)
+            _poll_fingerprints[path] = fingerprint
+        _queue_changes(changed)
+
+
+# Function to add changed files to the queue and wake up anything waiting for them
+def _queue_changes(changed):
+    global _last_change_time
+    if changed:
+        with _changes_condition:
+            _changed_files.update(changed)
+            _last_change_time = time.monotonic()
+            _changes_condition.notify_all()
+
+
+# Function to start watching the given files, or change which files are watched
+def watch_files(paths):
+    global _watcher_thread, backend, _tracked_files
+    _tracked_files = frozenset(normalise_path(path) for path in paths)
+
+    if _watcher_thread is None:
+        if _init_inotify():
+            backend = 'inotify'
+            target = _inotify_loop
+        else:
+            backend = 'polling'
+            target = _polling_loop
+        _watcher_thread = threading.Thread(target=target, daemon=True)
+        _watcher_thread.start()
+        logging.info(f"Watching tracked files for changes using {backend}.")
+
+    if backend == 'inotify':
+        _update_inotify_watches()
+    else:
+        for path in _tracked_files:
+            _poll_fingerprints.setdefault(path, _poll_fingerprint(path))
+
+
+# Function to wait until tracked files change (or the timeout passes), returning the changed paths
+def wait_for_changes(timeout):
+    deadline = time.monotonic() + timeout
+    with _changes_condition:
+        while not _changed_files:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            _changes_condition.wait(remaining)
+
+        # Keep collecting until the files have been quiet for a moment, so one save isn't reported many times
+        debounce_deadline = time.monotonic() + max_debounce_seconds
+        while time.monotonic() < debounce_deadline:
+            quiet_for = time.monotonic() - _last_change_time
+            if quiet_for >= debounce_seconds:
+                break
+            _changes_condition.wait(debounce_seconds - quiet_for)
+
+        changed = set(_changed_files)
+        _changed_files.clear()
+        return changed
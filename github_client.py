@@ -0,0 +1,372 @@
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from requests.models import PreparedRequest
+
+# Variable Declaration
+connect_timeout = 10  # seconds
+read_timeout = 60  # seconds
+max_retries = 4
+backoff_base = 1  # seconds, doubled on each retry
+backoff_max = 30  # seconds
+retry_statuses = {500, 502, 503, 504}
+idempotent_methods = {"GET", "HEAD", "OPTIONS"}  # safe to send again after a read timeout
+pool_size = 16  # connections kept alive per host
+response_cache_file = 'http_cache.json'
+response_cache_limit = 5000  # entries
+persisted_body_limit = 64 * 1024  # characters, bigger bodies (like file contents) are only cached in memory
+cacheable_paths = ('/contents/', '/commits', '/git/trees/')
+rate_limit_pacing_fraction = 0.2  # start spacing requests out once less than this share of the budget is left
+max_rate_limit_waits = 5  # per request
+secondary_rate_limit_wait = 60  # seconds, used when GitHub doesn't say how long to wait
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+request_count = 0
+retry_count = 0
+total_latency = 0.0
+max_latency = 0.0
+cache_revalidations = 0
+rate_limit_waits = 0
+requests_waiting = 0
+
+_rate_limits = {}  # budget -> {'remaining', 'limit', 'reset'}
+_next_request_time = {}  # budget -> earliest time the next paced request may start
+_rate_limit_lock = threading.Lock()
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+_response_cache_dirty = False
+
+
+# Function to change the default timeouts, e.g. from the 'http_timeouts' setting
+def configure(timeouts=None):
+    global connect_timeout, read_timeout
+    if timeouts:
+        connect_timeout = timeouts.get('connect', connect_timeout)
+        read_timeout = timeouts.get('read', read_timeout)
+
+
+# Function to get the shared session, which keeps connections alive between requests
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+# Function to read the response cache file, returning an empty cache if it is missing or corrupt
+def _read_response_cache_file():
+    if not os.path.exists(response_cache_file):
+        return {}
+    try:
+        with open(response_cache_file, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+# Function to load the response cache from disk (only done once per process)
+def _load_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = _read_response_cache_file()
+    return _response_cache
+
+
+# Function to write the response cache back to disk. Only small bodies are saved, so the file stays quick to load
+# and write however many big files are tracked.
+def save_response_cache():
+    global _response_cache_dirty
+    with _response_cache_lock:
+        if _response_cache is None or not _response_cache_dirty:
+            return
+        # The CLI and the background app share the file, so merge in anything the other one wrote (newest wins)
+        merged = {key: entry for key, entry in _read_response_cache_file().items() if isinstance(entry, dict)}
+        for key, entry in _response_cache.items():
+            if key not in merged or merged[key].get('stored', 0) <= entry['stored']:
+                merged[key] = entry
+        merged = {key: entry for key, entry in merged.items() if len(entry.get('body', '')) <= persisted_body_limit}
+        # Keep the most recently stored entries if the cache grew too big
+        if len(merged) > response_cache_limit:
+            merged = dict(sorted(merged.items(), key=lambda item: item[1].get('stored', 0),
+                                 reverse=True)[:response_cache_limit])
+        temp_file = response_cache_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(merged, f)
+        os.replace(temp_file, response_cache_file)
+        # Entries too big to save are kept for the rest of this run
+        _response_cache.update(merged)
+        _response_cache_dirty = False
+
+
+atexit.register(save_response_cache)
+
+
+# Function to check if a GET response for this URL should be stored and revalidated with its ETag
+def _is_cacheable(method, url, kwargs):
+    return method == "GET" and not kwargs.get('stream') and any(path in url for path in cacheable_paths)
+
+
+# Function to build the cache key for a URL and its query parameters
+def _cache_key(url, params):
+    prepared = PreparedRequest()
+    prepared.prepare_url(url, params)
+    return prepared.url
+
+
+# Function to add If-None-Match to a request if there is a cached copy of the response
+def _add_conditional_header(key, kwargs):
+    with _response_cache_lock:
+        entry = _load_response_cache().get(key)
+    if entry is not None:
+        kwargs['headers'] = {**(kwargs.get('headers') or {}), 'If-None-Match': entry['etag']}
+    return entry
+
+
+# Function to store a response with an ETag, or turn a 304 Not Modified back into the cached response
+def _apply_response_cache(key, entry, response):
+    global _response_cache_dirty, cache_revalidations
+    if response.status_code == 304 and entry is not None:
+        response.status_code = 200
+        response._content = entry['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        with _stats_lock:
+            cache_revalidations += 1
+    elif response.status_code == 200 and response.headers.get('ETag'):
+        try:
+            body = response.content.decode('utf-8')
+        except UnicodeDecodeError:
+            return response
+        with _response_cache_lock:
+            _load_response_cache()[key] = {'etag': response.headers['ETag'], 'body': body, 'stored': time.time()}
+            _response_cache_dirty = True
+    return response
+
+
+# Function to get the rate limit budget a request is charged to, or None if it isn't a GitHub API request
+def _rate_limit_budget(url, kwargs):
+    if not url.startswith("https://api.github.com/"):
+        return None
+    headers = kwargs.get('headers') or {}
+    # Authenticated and anonymous requests have separate budgets
+    return 'authenticated' if headers.get('Authorization') else 'anonymous'
+
+
+# Function to remember the budget GitHub reported in a response
+def _update_rate_limit(budget, response):
+    remaining = response.headers.get('X-RateLimit-Remaining')
+    reset = response.headers.get('X-RateLimit-Reset')
+    if budget is None or remaining is None or reset is None:
+        return
+    if response.headers.get('X-RateLimit-Resource', 'core') != 'core':
+        return
+    with _rate_limit_lock:
+        _rate_limits[budget] = {
+            'remaining': int(remaining),
+            'limit': int(response.headers.get('X-RateLimit-Limit', remaining)),
+            'reset': int(reset)
+        }
+
+
+# Function to sleep for a while, counting this request as waiting so the backlog can be shown
+def _wait(delay, message):
+    global requests_waiting, rate_limit_waits
+    with _stats_lock:
+        rate_limit_waits += 1
+    with _rate_limit_lock:
+        requests_waiting += 1
+        waiting = requests_waiting
+    resume_at = time.strftime('%H:%M:%S', time.localtime(time.time() + delay))
+    logging.warning(f"{message} {waiting} request(s) waiting, resuming at {resume_at}.")
+    if delay > 5:
+        print(f"{message} {waiting} request(s) waiting, resuming at {resume_at}.")
+    try:
+        time.sleep(delay)
+    finally:
+        with _rate_limit_lock:
+            requests_waiting -= 1
+
+
+# Function to hold a request back until it fits in the rate limit budget
+def _wait_for_rate_limit(budget):
+    if budget is None:
+        return
+    with _rate_limit_lock:
+        state = _rate_limits.get(budget)
+        if state is None:
+            return
+        now = time.time()
+        if state['reset'] <= now:
+            # The window has reset, the next response will say how much is left
+            del _rate_limits[budget]
+            _next_request_time.pop(budget, None)
+            return
+
+        if state['remaining'] <= 0:
+            # Out of budget, pause until GitHub resets it
+            start_at = state['reset'] + 1
+        elif state['remaining'] < state['limit'] * rate_limit_pacing_fraction:
+            # Running low, spread what is left evenly over the rest of the window
+            interval = (state['reset'] - now) / state['remaining']
+            start_at = max(now, _next_request_time.get(budget, now))
+            _next_request_time[budget] = start_at + interval
+        else:
+            start_at = now
+        state['remaining'] -= 1  # Reserve a request until the response reports the real figure
+        remaining = state['remaining']
+    delay = start_at - now
+    if delay > 0:
+        _wait(delay, f"GitHub rate limit: {max(remaining, 0)} request(s) left in this window.")
+
+
+# Function to work out how long to wait after GitHub refused a request for exceeding a rate limit
+def _rate_limited_delay(response):
+    if response.status_code not in (403, 429):
+        return None
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is not None and retry_after.isdigit():
+        return int(retry_after)
+    if response.headers.get('X-RateLimit-Remaining') == '0':
+        return max(0.0, int(response.headers.get('X-RateLimit-Reset', 0)) - time.time()) + 1
+    if 'secondary rate limit' in response.text.lower():
+        return secondary_rate_limit_wait
+    return None
+
+
+# Function to record how long a request took
+def _record_latency(method, url, latency, status):
+    global request_count, total_latency, max_latency
+    with _stats_lock:
+        request_count += 1
+        total_latency += latency
+        max_latency = max(max_latency, latency)
+    logging.debug(f"{method} {url} -> {status} in {latency * 1000:.0f}ms")
+
+
+# Function to work out how long to wait before a retry (exponential backoff with full jitter)
+def _backoff_delay(attempt):
+    return random.uniform(0, min(backoff_max, backoff_base * 2 ** attempt))
+
+
+# Function to send a request through the shared session, retrying server errors and dropped connections. Only
+# requests that are safe to repeat are retried after a read timeout. (limit_waits is how many times a rate-limited request is waited on and sent again)
+def request(method, url, timeout=None, retries=None, limit_waits=None, **kwargs):
+    global retry_count
+    if timeout is None:
+        timeout = (connect_timeout, read_timeout)
+    if retries is None:
+        retries = max_retries
+    if limit_waits is None:
+        limit_waits = max_rate_limit_waits
+    session = get_session()
+    budget = _rate_limit_budget(url, kwargs)
+
+    cache_key = None
+    cache_entry = None
+    if _is_cacheable(method, url, kwargs):
+        cache_key = _cache_key(url, kwargs.get('params'))
+        cache_entry = _add_conditional_header(cache_key, kwargs)
+
+    attempt = 0
+    waits = 0
+    while True:
+        _wait_for_rate_limit(budget)
+        if hasattr(kwargs.get('data'), 'seek'):
+            kwargs['data'].seek(0)  # Streamed bodies have to be rewound before they are sent again
+        start = time.monotonic()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+            error = None
+        except (requests.ConnectionError, requests.Timeout) as e:
+            response = None
+            error = e
+        _record_latency(method, url, time.monotonic() - start,
+                        response.status_code if response is not None else type(error).__name__)
+        if error is not None and not isinstance(error, requests.ConnectionError) and \
+                method not in idempotent_methods:
+            # A read timeout doesn't mean the request failed, so sending it again could apply it twice
+            raise error
+
+        if response is not None:
+            _update_rate_limit(budget, response)
+            delay = _rate_limited_delay(response)
+            if delay is not None and waits < limit_waits:
+                # Rate limited rather than failed, so wait for the limit to lift and send it again
+                waits += 1
+                _wait(delay, f"GitHub rate limit hit on {method} {url}.")
+                continue
+
+        if response is not None and response.status_code not in retry_statuses:
+            if cache_key is not None:
+                return _apply_response_cache(cache_key, cache_entry, response)
+            return response
+        if attempt >= retries:
+            if response is not None:
+                return response
+            raise error
+
+        delay = _backoff_delay(attempt)
+        reason = response.status_code if response is not None else error
+        logging.warning(f"{method} {url} failed ({reason}), retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+        with _stats_lock:
+            retry_count += 1
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request("PUT", url, **kwargs)
+
+
+def patch(url, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+
+# Function to reset the latency counters at the start of a check
+def reset_stats():
+    global request_count, retry_count, total_latency, max_latency, cache_revalidations, rate_limit_waits
+    with _stats_lock:
+        request_count = 0
+        retry_count = 0
+        cache_revalidations = 0
+        rate_limit_waits = 0
+        total_latency = 0.0
+        max_latency = 0.0
+
+
+# Function to describe the request counters for the log
+def stats_message():
+    with _stats_lock:
+        average = total_latency / request_count if request_count else 0.0
+        message = (f"HTTP: {request_count} request(s), {cache_revalidations} unchanged (304), {retry_count} retry(s), "
+                   f"{rate_limit_waits} rate limit wait(s), average {average * 1000:.0f}ms, "
+                   f"slowest {max_latency * 1000:.0f}ms.")
+    with _rate_limit_lock:
+        for budget, state in _rate_limits.items():
+            message += f" {budget.capitalize()} budget: {max(state['remaining'], 0)}/{state['limit']}."
+    return message
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Variable Declaration
+hash_cache_file = 'file_hashes.json'
+racy_window = 2  # seconds, files modified this recently are hashed but not cached
+
+_cache = None
+_cache_lock = threading.Lock()
+_cache_dirty = False
+cache_hits = 0
+cache_misses = 0
+
+
+# Function to build the key used to find a file in the cache
+def _cache_key(filename):
+    return os.path.normcase(os.path.abspath(filename))
+
+
+# Function to build the fingerprint used to decide whether a cached hash is still valid
+def _stat_fingerprint(stat_result):
+    # st_ino holds the inode on Linux/macOS and the file index on Windows
+    return [stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino]
+
+
+# Function to load the hash cache from disk (only done once per process)
+def load_hash_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = _read_cache_file()
+        return _cache
+
+
+# Function to read the cache file, returning an empty cache if it is missing or corrupt
+def _read_cache_file():
+    if not os.path.exists(hash_cache_file):
+        return {}
+    try:
+        with open(hash_cache_file, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+# Function to write the hash cache back to disk
+def save_hash_cache():
+    global _cache_dirty
+    with _cache_lock:
+        if _cache is None or not _cache_dirty:
+            return
+        # The CLI and the background app share the file, so merge in anything the other one wrote
+        merged = _read_cache_file()
+        merged.update(_cache)
+        # Drop entries for files that no longer exist
+        merged = {path: entry for path, entry in merged.items() if os.path.exists(path)}
+        temp_file = hash_cache_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(merged, f)
+        os.replace(temp_file, hash_cache_file)
+        _cache.clear()
+        _cache.update(merged)
+        _cache_dirty = False
+
+
+# Function to remove a file from the cache, forcing it to be rehashed next time
+def invalidate_file_hash(filename):
+    global _cache_dirty
+    cache = load_hash_cache()
+    with _cache_lock:
+        if cache.pop(_cache_key(filename), None) is not None:
+            _cache_dirty = True
+
+
+# Function to hash a file without using the cache, returning its SHA-256 and its git blob SHA-1
+def compute_file_hashes(filename):
+    while True:
+        with open(filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            hasher = hashlib.sha256()  # Use SHA-256 for hashing
+            blob_hasher = hashlib.sha1(f"blob {size}\0".encode())  # Git hashes a "blob <len>\0" header first
+            bytes_read = 0
+            while chunk := f.read(1024 * 1024):  # Read in chunks to avoid memory issues
+                hasher.update(chunk)
+                blob_hasher.update(chunk)
+                bytes_read += len(chunk)
+        # If the file grew or shrank while reading, the blob header is wrong, so hash it again
+        if bytes_read == size:
+            return hasher.hexdigest(), blob_hasher.hexdigest()
+
+
+# Function to get the SHA-256 and git blob SHA-1 of a file, reusing the cached hashes if the file is unchanged
+def get_file_hashes(filename):
+    global cache_hits, cache_misses, _cache_dirty
+    cache = load_hash_cache()
+    key = _cache_key(filename)
+    fingerprint = _stat_fingerprint(os.stat(filename))
+
+    with _cache_lock:
+        entry = cache.get(key)
+        if entry is not None and entry.get('stat') == fingerprint and 'git_sha' in entry:
+            cache_hits += 1
+            return entry['sha256'], entry['git_sha']
+        cache_misses += 1
+
+    file_hash, git_sha = compute_file_hashes(filename)
+
+    # Only cache the result if the file didn't change while it was being read, and wasn't modified so
+    # recently that another write could land inside the same timestamp tick
+    after = os.stat(filename)
+    if _stat_fingerprint(after) == fingerprint and time.time() - after.st_mtime > racy_window:
+        with _cache_lock:
+            cache[key] = {'stat': fingerprint, 'sha256': file_hash, 'git_sha': git_sha}
+            _cache_dirty = True
+    return file_hash, git_sha
+
+
+# Hashing function to get the content hash of a file
+def get_file_hash(filename):
+    return get_file_hashes(filename)[0]
+
+
+# Function to get the git blob SHA-1 of a file, as GitHub reports it in the 'sha' field
+def get_git_blob_sha(filename):
+    return get_file_hashes(filename)[1]
+
+
+# Function to reset the hit and miss counters at the start of a check
+def reset_cache_stats():
+    global cache_hits, cache_misses
+    cache_hits = 0
+    cache_misses = 0
+
+
+# Function to describe the hit and miss counters for the log
+def cache_stats_message():
+    return f"Hash cache: {cache_hits} hit(s), {cache_misses} miss(es)."
@@ -0,0 +1,93 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+# Variable Declaration
+PRIORITY_PROCESS_CLOSED = 0  # lower runs first when several jobs are due
+PRIORITY_CHANGED_FILES = 1
+PRIORITY_FULL_CHECK = 2
+
+
+# Runs named jobs one at a time on a single thread, each either at a set time or as soon as an event asks for it.
+# Jobs wait in a heap ordered by when they are due, and the thread sleeps on a condition until the next one is due
+# or a new job arrives, so nothing spins while idle. Scheduling a job that is already waiting replaces it (keeping
+# the earlier time), so a burst of events runs the job once.
+class JobScheduler:
+    def __init__(self):
+        self._heap = []  # (due time, priority, sequence, name)
+        self._jobs = {}  # name -> (sequence, function, args, due time), only the latest sequence of a name is run
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    # Function to run a job after a delay in seconds (or straight away)
+    def schedule(self, name, function, *args, delay=0, priority=PRIORITY_FULL_CHECK):
+        due = time.monotonic() + delay
+        with self._condition:
+            queued = self._jobs.get(name)
+            if queued is not None:
+                # Keep the earlier of the two times, and drop the heap entry of the job being replaced
+                due = min(due, queued[3])
+            sequence = next(self._sequence)
+            self._jobs[name] = (sequence, function, args, due)
+            heapq.heappush(self._heap, (due, priority, sequence, name))
+            self._condition.notify()
+
+    # Function to run a job as soon as the current one (if any) is done
+    def trigger(self, name, function, *args, priority=PRIORITY_CHANGED_FILES):
+        self.schedule(name, function, *args, delay=0, priority=priority)
+
+    # Function to get the next job to run, waiting until one is due. Of the jobs that are due, the one with the
+    # highest priority runs first.
+    def _next_job(self):
+        with self._condition:
+            while not self._stopped:
+                # Entries for jobs that were replaced are skipped
+                while self._heap and self._jobs.get(self._heap[0][3], (None,))[0] != self._heap[0][2]:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                if self._heap[0][0] > now:
+                    self._condition.wait(self._heap[0][0] - now)
+                    continue
+
+                due_entries = []
+                while self._heap and self._heap[0][0] <= now:
+                    due_entries.append(heapq.heappop(self._heap))
+                due_entries = [entry for entry in due_entries if self._jobs.get(entry[3], (None,))[0] == entry[2]]
+                if not due_entries:
+                    continue
+                chosen = min(due_entries, key=lambda entry: (entry[1], entry[0]))
+                for entry in due_entries:
+                    if entry is not chosen:
+                        heapq.heappush(self._heap, entry)
+                name = chosen[3]
+                _, function, args, _ = self._jobs.pop(name)
+                return name, function, args
+            return None
+
+    # Function to run jobs until the scheduler is stopped
+    def run(self):
+        while (job := self._next_job()) is not None:
+            name, function, args = job
+            try:
+                function(*args)
+            except Exception as e:
+                logging.exception(f"Job {name} failed: {e}")
+                print(f"Job {name} failed: {e}")
+
+    # Function to start running jobs on a background thread
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    # Function to stop once the current job (if any) is done
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
@@ -1,33 +1,133 @@
+import json
 import os
 import shutil
 import subprocess
 import sys
+import threading
+import time
 import zipfile
 import requests
 
+import delta_patch
+import github_client
+import ranged_download
+import release_manifest
+
 # Variable Declaration
 owner_name = "MDMAinsley"
 repo_name = "file-backup"
 application_name = "FileBackup_Data.exe"
 updater_name = "FileBackup_Updater.exe"
+version_file_name = "version.txt"  # written by the app and the updater, so the exe doesn't have to be run
+release_cache_name = "release_cache.json"
+release_cache_ttl = 6 * 60 * 60  # seconds between checks for a new release
+release_check_timeout = (5, 15)  # seconds, connect and read
+version_probe_timeout = 30  # seconds
+
+
+# Function to get the installed version, from the version file or (for installs from before it existed) by asking
+# the app once
+def get_installed_version(app_dir, app_exe_path):
+    version_path = os.path.join(app_dir, version_file_name)
+    try:
+        with open(version_path, 'r') as f:
+            version = f.read().strip()
+        if version:
+            return normalize_version(version)
+    except OSError:
+        pass
+
+    try:
+        version = subprocess.run([app_exe_path, "--version"], capture_output=True, text=True,
+                                 timeout=version_probe_timeout).stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if version:
+        # Saved so later launches don't have to ask, a folder that can't be written to only means asking again
+        try:
+            with open(version_path, 'w') as f:
+                f.write(version)
+        except OSError as e:
+            print(f"Could not save the version file: {e}")
+    return normalize_version(version) or None
+
+
+# Function to load the saved details of the latest release, or None if there aren't any
+def load_release_cache(app_dir):
+    try:
+        with open(os.path.join(app_dir, release_cache_name), 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached.get('release'), dict) or 'tag_name' not in cached['release']:
+        return None
+    return cached
+
+
+# Function to save the details of the latest release
+def save_release_cache(app_dir, cached):
+    cache_path = os.path.join(app_dir, release_cache_name)
+    temp_path = cache_path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(cached, f)
+    os.replace(temp_path, cache_path)
+
+
+# Function to fetch the latest release and save what is needed to offer and install it. The saved ETag is sent
+# along, so an unchanged release costs an empty 304 response. Failures keep the saved copy.
+def refresh_release_cache(app_dir, latest_version_url):
+    cached = load_release_cache(app_dir)
+    headers = {'If-None-Match': cached['etag']} if cached and cached.get('etag') else {}
+    try:
+        response = github_client.get(latest_version_url, headers=headers, timeout=release_check_timeout, retries=1,
+                                     limit_waits=0)
+    except OSError:
+        return cached
+
+    if response.status_code == 304 and cached:
+        cached['checked'] = time.time()
+    elif response.status_code == 200:
+        latest_release = response.json()
+        cached = {
+            'etag': response.headers.get('ETag'),
+            'checked': time.time(),
+            'release': {
+                'tag_name': latest_release['tag_name'].strip(),
+                'body': latest_release.get('body') or 'No description available.',
+                'assets': [{'name': asset['name'], 'browser_download_url': asset['browser_download_url'],
+                            'digest': asset.get('digest')}
+                           for asset in latest_release.get('assets', [])]
+            }
+        }
+    else:
+        return cached
+    save_release_cache(app_dir, cached)
+    return cached
+
+
+# Function to get the latest version tag and its description from the saved release
+def get_latest_version(latest_release):
+    return latest_release['tag_name'], latest_release['body']
 
 
-# Function to get the latest version tag from GitHub API
-def get_latest_version(latest_version_url):
-    response = requests.get(latest_version_url)
-    response.raise_for_status()
-    latest_release = response.json()
-    latest_version = latest_release['tag_name'].strip()
-    description = latest_release.get('body', 'No description available.')
-    return latest_version, description
+# Function to download the update zip file over several connections, resuming an earlier attempt if there was one
+def download_update_zip(download_url, download_path, expected_sha256=None):
+    ranged_download.download_file(download_url, download_path, expected_sha256)
 
 
-# Function to download the update zip file
-def download_update_zip(download_url, download_path):
-    response = requests.get(download_url, stream=True)
-    response.raise_for_status()
-    with open(download_path, 'wb') as zip_file:
-        shutil.copyfileobj(response.raw, zip_file)
+# Function to find the published SHA-256 of a release asset, from GitHub's digest of it or a .sha256 file uploaded
+# alongside it. Returns None if neither exists.
+def get_published_sha256(latest_release, asset):
+    digest = asset.get('digest') or ''
+    if digest.startswith('sha256:'):
+        return digest[len('sha256:'):]
+    for checksum_asset in latest_release['assets']:
+        if checksum_asset['name'] == asset['name'] + ".sha256":
+            response = github_client.get(checksum_asset['browser_download_url'], timeout=release_check_timeout)
+            response.raise_for_status()
+            # Same format as sha256sum: the hash, then the file name
+            return response.text.split()[0].lower()
+    return None
 
 
 # Function to extract the zip file to a versioned folder
@@ -91,6 +191,103 @@ def specific_input(question_to_ask, required_answers=None, input_type=None):
         return user_input
 
 
+# Function to find a release asset by name
+def find_asset(latest_release, asset_name):
+    for asset in latest_release['assets']:
+        if asset['name'] == asset_name:
+            return asset
+    return None
+
+
+# Function to rebuild a component from the installed copy and a published patch, returning False if that failed
+def stage_from_patch(app_dir, latest_release, component, patch, staged_path):
+    patch_asset = find_asset(latest_release, patch['asset'])
+    if patch_asset is None:
+        return False
+    patch_path = staged_path + ".patch"
+    try:
+        ranged_download.download_file(patch_asset['browser_download_url'], patch_path, patch['sha256'])
+        if delta_patch.apply_delta(os.path.join(app_dir, component), patch_path, staged_path):
+            return True
+        print(f"Patching {component} gave the wrong result.")
+    except (OSError, ValueError) as e:
+        print(f"Could not patch {component}: {e}")
+    finally:
+        if os.path.exists(patch_path):
+            os.remove(patch_path)
+    if os.path.exists(staged_path):
+        os.remove(staged_path)
+    return False
+
+
+# Function to stage only the components that changed into staging_dir, using the release manifest. Each one is
+# patched from the installed copy if the release has a patch for it, or downloaded whole otherwise. Returns False if
+# the release has no manifest or it couldn't be used, so the full zip is downloaded instead.
+def stage_changed_components(app_dir, latest_release, staging_dir):
+    manifest_asset = find_asset(latest_release, release_manifest.manifest_asset_name)
+    if manifest_asset is None:
+        return False
+    try:
+        response = github_client.get(manifest_asset['browser_download_url'], timeout=release_check_timeout)
+        response.raise_for_status()
+        manifest = response.json()
+        changed = release_manifest.changed_components(manifest, app_dir)
+        print(f"{len(changed)} of {len(manifest['components'])} component(s) changed.")
+        os.makedirs(staging_dir, exist_ok=True)
+        for component, entry, installed_sha256 in changed:
+            staged_path = os.path.join(staging_dir, component)
+            if release_manifest.file_sha256(staged_path) == entry['sha256']:
+                continue  # Staged by an earlier attempt
+            patch = entry['patches'].get(installed_sha256) if installed_sha256 else None
+            if patch is not None and stage_from_patch(app_dir, latest_release, component, patch, staged_path):
+                print(f"Patched {component} ({patch['size']} bytes instead of {entry['size']}).")
+                continue
+            component_asset = find_asset(latest_release, entry['asset'])
+            if component_asset is None:
+                raise ValueError(f"the release has no {entry['asset']}")
+            ranged_download.download_file(component_asset['browser_download_url'], staged_path, entry['sha256'])
+        return True
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not stage a differential update ({e}), downloading the full release instead.")
+        return False
+
+
+# Function to download and extract the whole release zip into staging_dir
+def stage_full_release(app_dir, latest_release, staging_dir):
+    latest_version_raw = latest_release['tag_name']
+    # Find the zip file in the release's assets
+    target_asset_name = f"v{latest_version_raw}.zip"
+    zip_asset = None
+    for asset in latest_release['assets']:
+        if target_asset_name in asset['name'] and not asset['name'].endswith(".sha256"):
+            zip_asset = asset
+            break
+    if zip_asset is None:
+        raise ValueError(f"Launcher could not find zip file for version {normalize_version(latest_version_raw)}")
+    expected_sha256 = get_published_sha256(latest_release, zip_asset)
+    if expected_sha256 is None:
+        print("Warning: this release has no published SHA-256, the download can't be verified.")
+    # Download the zip file, it is checked against the published SHA-256 before anything is extracted
+    zip_file_path = os.path.join(app_dir, target_asset_name)
+    download_update_zip(zip_asset['browser_download_url'], zip_file_path, expected_sha256)
+    extract_zip(zip_file_path, staging_dir)
+
+
+# Function to stage an update, then hand over to the updater to swap the files in
+def install_update(app_dir, latest_release, updater_path):
+    # Staged in a versioned folder next to the app, so the updater's renames never cross file systems
+    staging_dir = os.path.join(app_dir, f"update_{latest_release['tag_name']}")
+    if not stage_changed_components(app_dir, latest_release, staging_dir):
+        stage_full_release(app_dir, latest_release, staging_dir)
+    # Replace Updater, if it changed
+    new_updater_path = os.path.join(staging_dir, updater_name)
+    if os.path.exists(new_updater_path):
+        shutil.copy(new_updater_path, updater_path)
+    # Close Launcher and start Updater to handle the rest
+    subprocess.Popen([updater_path, staging_dir])
+    sys.exit(0)
+
+
 # Main Function
 def main():
     app_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
@@ -99,50 +296,36 @@ def main():
     updater_path = os.path.join(app_dir, updater_name)
 
     try:
-        # Get the current and latest version
-        current_version_raw = subprocess.run([app_exe_path, "--version"], capture_output=True, text=True).stdout.strip()
-        current_version = normalize_version(current_version_raw)
-        latest_version_raw, description = get_latest_version(latest_version_url)
-        latest_version = normalize_version(latest_version_raw)
-
-        if current_version != latest_version:
-            print(f"Update v{latest_version} is now available!")
-            print(f"Changelog: \n {description}")
-            if specific_input(f"Would you like to update? (y/n): ", ["y", "Y", "n", "N"]).lower() == "y":
-                print("Starting Update...")
-                # Find the download URL for the zip asset from the latest release
-                response = requests.get(latest_version_url)
-                latest_release = response.json()
-                # Example of finding the zip file in assets
-                target_asset_name = f"v{latest_version_raw}.zip"
-                download_url = None
-                for asset in latest_release['assets']:
-                    if target_asset_name in asset['name']:
-                        download_url = asset['browser_download_url']
-                        break
-                if not download_url:
-                    raise Exception(f"Launcher could not find zip file for version {latest_version}")
-                # Download the zip file
-                zip_file_path = os.path.join(app_dir, target_asset_name)
-                download_update_zip(download_url, zip_file_path)
-                # Extract to a versioned folder
-                extract_to = os.path.join(app_dir, f"update_{latest_version_raw}")
-                extract_zip(zip_file_path, extract_to)
-                # print(f"LAUNCHER: Extracted update to {extract_to}")
-                # Replace Updater
-                new_updater_path = os.path.join(extract_to, updater_name)
-                shutil.copy(new_updater_path, updater_path)
-                # print("LAUNCHER: GF_Updater.exe replaced.")
-                # Close Launcher and start Updater to handle the rest
-                # print("LAUNCHER: Starting GF_Updater...")
-                subprocess.Popen([updater_path, extract_to])
-                sys.exit(0)
-            else:
-                print("Skipping update (not recommended)...")
-                subprocess.run([app_exe_path], check=True)
-        else:
-            print("No update available. Starting application...")
-            subprocess.run([app_exe_path], check=True)
+        # Offer an update found by an earlier launch, nothing here waits on the network
+        current_version = get_installed_version(app_dir, app_exe_path)
+        cached = load_release_cache(app_dir)
+        if cached is not None and current_version is not None:
+            latest_version_raw, description = get_latest_version(cached['release'])
+            latest_version = normalize_version(latest_version_raw)
+            if current_version != latest_version:
+                print(f"Update v{latest_version} is now available!")
+                print(f"Changelog: \n {description}")
+                if specific_input(f"Would you like to update? (y/n): ", ["y", "Y", "n", "N"]).lower() == "y":
+                    print("Starting Update...")
+                    try:
+                        install_update(app_dir, cached['release'], updater_path)
+                    except (OSError, ValueError) as e:
+                        # A download that stopped part way resumes on the next launch, the app still starts
+                        print(f"Update failed ({e}), starting the current version...")
+                else:
+                    print("Skipping update (not recommended)...")
+
+        # Look for a newer release while the application runs, it is offered on the next launch
+        release_check = None
+        if cached is None or time.time() - cached.get('checked', 0) > release_cache_ttl:
+            release_check = threading.Thread(target=refresh_release_cache, args=(app_dir, latest_version_url),
+                                             daemon=True)
+            release_check.start()
+
+        print("Starting application...")
+        subprocess.run([app_exe_path], check=True)
+        if release_check is not None:
+            release_check.join(timeout=release_check_timeout[0])
 
     except requests.ConnectionError:
         print("No Internet Connection. Starting application in Offline Mode...")
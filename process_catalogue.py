@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+import time
+
+import github_client
+import remote_snapshot
+
+# Variable Declaration
+catalogue_file = 'process_catalogue.json'
+catalogue_path = 'process-list.json'  # in the repository
+catalogue_ttl = 24 * 60 * 60  # seconds, an older copy is still used but refreshed in the background
+refresh_timeout = (5, 15)  # seconds, connect and read
+
+_lock = threading.Lock()
+_refresh_thread = None
+
+
+# Function to read the saved copy of the catalogue, or None if there isn't a usable one
+def _read_cache():
+    if not os.path.exists(catalogue_file):
+        return None
+    try:
+        with open(catalogue_file, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached.get('catalogue'), dict):
+        return None
+    return cached
+
+
+# Function to save a copy of the catalogue along with its ETag and when it was last checked
+def _write_cache(cached):
+    temp_file = catalogue_file + ".tmp"
+    with open(temp_file, 'w') as f:
+        json.dump(cached, f)
+    os.replace(temp_file, catalogue_file)
+
+
+# Function to download the catalogue if it changed, returning it or None if it couldn't be fetched. The saved
+# ETag is sent along so an unchanged catalogue costs an empty 304 response.
+def refresh_catalogue(repo):
+    with _lock:
+        cached = _read_cache()
+        headers = {'If-None-Match': cached['etag']} if cached and cached.get('etag') else {}
+        # raw.githubusercontent.com isn't charged to the small anonymous API rate limit
+        url = f"https://raw.githubusercontent.com/{repo}/{remote_snapshot.branch_name}/{catalogue_path}"
+        try:
+            # Don't retry or wait out a rate limit, the saved copy is good enough until next time
+            response = github_client.get(url, headers=headers, timeout=refresh_timeout, retries=0, limit_waits=0)
+        except OSError as e:
+            print(f"Could not fetch the process list ({e}), using the saved copy.")
+            return cached['catalogue'] if cached else None
+
+        if response.status_code == 304 and cached:
+            cached['checked'] = time.time()
+            _write_cache(cached)
+            return cached['catalogue']
+        if response.status_code == 200:
+            try:
+                catalogue = response.json()
+            except ValueError:
+                catalogue = None
+            if isinstance(catalogue, dict):
+                _write_cache({'etag': response.headers.get('ETag'), 'checked': time.time(), 'catalogue': catalogue})
+                return catalogue
+        print(f"Failed to fetch the process list ({response.status_code}), using the saved copy.")
+        return cached['catalogue'] if cached else None
+
+
+# Function to refresh the catalogue on a background thread, unless a refresh is already running
+def refresh_in_background(repo):
+    global _refresh_thread
+    if _refresh_thread is not None and _refresh_thread.is_alive():
+        return
+    _refresh_thread = threading.Thread(target=refresh_catalogue, args=(repo,), daemon=True)
+    _refresh_thread.start()
+
+
+# Function to get the process catalogue straight from the saved copy, refreshing it in the background once it is
+# older than catalogue_ttl. It is only waited for the first time, when there is no saved copy yet.
+def get_catalogue(repo):
+    cached = _read_cache()
+    if cached is None:
+        return refresh_catalogue(repo) or {}
+    if time.time() - cached.get('checked', 0) > catalogue_ttl:
+        refresh_in_background(repo)
+    return cached['catalogue']
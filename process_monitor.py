@@ -0,0 +1,38 @@
+import psutil
+
+# Variable Declaration
+_process_states = {}  # watchlist name -> whether it was running at the last tick
+
+
+# Function to get the names of every running process with a single walk of the process table
+def snapshot_process_names():
+    names = set()
+    # Only the name is prefetched, processes that exit or deny access mid-walk are skipped by psutil
+    for process in psutil.process_iter(['name']):
+        name = process.info['name']
+        if name:
+            names.add(name.casefold())
+    return names
+
+
+# Function to check the watchlist against one snapshot, returning the (name, 'opened'/'closed') events since the
+# last tick and the names that are currently running
+def poll_watchlist(process_watchlist):
+    running_names = snapshot_process_names()
+    events = []
+    running = []
+    for process_name in dict.fromkeys(process_watchlist):
+        is_running = process_name.casefold() in running_names
+        was_running = _process_states.get(process_name, False)
+        if is_running and not was_running:
+            events.append((process_name, 'opened'))
+        elif was_running and not is_running:
+            events.append((process_name, 'closed'))
+        if is_running:
+            running.append(process_name)
+        _process_states[process_name] = is_running
+
+    # Forget processes that were removed from the watchlist
+    for process_name in set(_process_states) - set(process_watchlist):
+        del _process_states[process_name]
+    return events, running
@@ -0,0 +1,95 @@
+import heapq
+import re
+from collections import Counter
+
+# Variable Declaration
+default_limit = 20  # results shown for a search
+min_score = 0.35  # matches scoring below this are left out
+substring_bonus = 1.0  # added when the search appears in a name as it is, so those always rank first
+min_trigram_query = 3  # characters, shorter searches are matched as substrings instead
+
+_separator_pattern = re.compile(r'[^0-9a-z]+')
+
+_index = None
+_indexed_catalogue = None
+
+
+# Function to reduce a name to lowercase letters and digits, so spacing and punctuation don't matter
+def normalise_name(name):
+    return _separator_pattern.sub('', name.lower())
+
+
+# Function to split a normalised name into the three-character pieces it is compared by
+def _trigrams(normalised):
+    padded = f"${normalised}$"
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+# Trigram index over a catalogue of {name: process}. Each entry is findable by its name and by its executable's
+# name, and typos or words in a different order still share most of their trigrams with the name they meant.
+class SearchIndex:
+    def __init__(self, catalogue):
+        self.entries = list(catalogue.items())
+        self.keys = []  # (entry number, normalised text, number of trigrams)
+        postings = {}
+        for entry_number, (name, process) in enumerate(self.entries):
+            texts = {normalise_name(name), normalise_name(process.rsplit('.', 1)[0])}
+            for text in texts:
+                if not text:
+                    continue
+                trigrams = _trigrams(text)
+                key_number = len(self.keys)
+                self.keys.append((entry_number, text, len(trigrams)))
+                for trigram in trigrams:
+                    postings.setdefault(trigram, []).append(key_number)
+        self.postings = postings
+
+    # Function to get the best matches for a search as {name: process}, best first
+    def search(self, query, limit=default_limit):
+        normalised = normalise_name(query)
+        if not normalised:
+            return dict(self.entries[:limit])
+        if len(normalised) < min_trigram_query:
+            return self._substring_search(normalised, limit)
+        query_trigrams = _trigrams(normalised)
+        # Counter counts in C, which keeps this fast with tens of thousands of names
+        shared_counts = Counter()
+        for trigram in query_trigrams:
+            posting = self.postings.get(trigram)
+            if posting:
+                shared_counts.update(posting)
+
+        best_scores = {}
+        query_size = len(query_trigrams)
+        for key_number, shared in shared_counts.items():
+            entry_number, text, key_size = self.keys[key_number]
+            # Half how much of the search was found, half how similar the two are overall
+            score = shared / query_size / 2 + shared / (query_size + key_size)
+            if normalised in text:
+                score += substring_bonus
+            if score >= min_score and score > best_scores.get(entry_number, 0):
+                best_scores[entry_number] = score
+
+        best = heapq.nlargest(limit, best_scores.items(),
+                              key=lambda item: (item[1], -len(self.entries[item[0]][0])))
+        return {self.entries[entry_number][0]: self.entries[entry_number][1] for entry_number, _ in best}
+
+    # Function to find names containing a search too short to share a trigram with them, in catalogue order
+    def _substring_search(self, normalised, limit):
+        results = {}
+        for entry_number, text, _ in self.keys:
+            if normalised in text:
+                name, process = self.entries[entry_number]
+                results[name] = process
+                if len(results) >= limit:
+                    break
+        return results
+
+
+# Function to get the search index for a catalogue, only building it again if the catalogue changed
+def get_search_index(catalogue):
+    global _index, _indexed_catalogue
+    if _index is None or catalogue != _indexed_catalogue:
+        _index = SearchIndex(catalogue)
+        _indexed_catalogue = dict(catalogue)
+    return _index
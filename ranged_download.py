@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import file_transfer
+import github_client
+
+# Variable Declaration
+default_parts = 4  # connections used at once
+min_part_size = 1024 * 1024  # bytes, smaller downloads use fewer connections
+chunk_size = 256 * 1024
+state_save_interval = 1  # seconds between saves of the resume state
+part_retries = 3  # times a failed part is resumed before giving up
+hash_chunk_size = 1024 * 1024
+
+
+# Function to get the paths of the partial download and its resume state
+def _partial_paths(destination):
+    return destination + ".part", destination + ".part.json"
+
+
+# Function to find the size of a download and whether the server can send it in ranges, returning
+# (size, validator, supports ranges). The validator (ETag or Last-Modified) tells if a partial download can be resumed.
+def _probe(url, headers):
+    response = github_client.get(url, headers={**headers, 'Range': 'bytes=0-0'}, stream=True)
+    try:
+        if response.status_code not in (200, 206):
+            raise OSError(f"Error fetching {url}: {response.status_code}")
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        if response.status_code == 206 and total.isdigit():
+            return int(total), validator, True
+        length = response.headers.get('Content-Length')
+        return (int(length) if length and length.isdigit() else None), validator, False
+    finally:
+        response.close()
+
+
+# Function to load the resume state of an earlier attempt, if it is for the same file
+def _load_state(state_path, url, size, validator):
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('url') != url or state.get('size') != size or state.get('validator') != validator:
+        return None
+    return state
+
+
+def _save_state(state_path, state):
+    temp_path = state_path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(temp_path, state_path)
+
+
+# Function to split a download into ranges of [start, end, bytes done]
+def _split(size, parts):
+    parts = max(1, min(parts, size // min_part_size))
+    part_size = -(-size // parts)
+    return [[start, min(start + part_size, size) - 1, 0] for start in range(0, size, part_size)]
+
+
+# Function to download one range into its place in the partial file, resuming from what it already has
+def _download_part(url, headers, part_path, part, state_lock, on_progress):
+    for attempt in range(part_retries + 1):
+        start, end, done = part
+        if start + done > end:
+            return
+        try:
+            response = github_client.get(url, headers={**headers, 'Range': f"bytes={start + done}-{end}"},
+                                         stream=True)
+            try:
+                if response.status_code != 206:
+                    raise OSError(f"Range request failed: {response.status_code}")
+                with open(part_path, 'r+b') as f:
+                    f.seek(start + done)
+                    for block in response.iter_content(chunk_size=chunk_size):
+                        f.write(block)
+                        with state_lock:
+                            part[2] += len(block)
+                        on_progress()
+            finally:
+                response.close()
+            return
+        except OSError as e:
+            if attempt >= part_retries:
+                raise
+            print(f"Download of bytes {start + part[2]}-{end} failed ({e}), resuming...")
+            time.sleep(2 ** attempt)
+
+
+# Function to check a file's SHA-256
+def _file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(hash_chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# Function to download a file over several connections at once, each fetching its own byte range. Progress is saved
+# next to the partial file, so a download that is interrupted carries on where it stopped the next time. The file
+# only replaces destination once it is complete and (if expected_sha256 is given) matches it.
+def download_file(url, destination, expected_sha256=None, headers=None, parts=default_parts):
+    headers = headers or {}
+    part_path, state_path = _partial_paths(destination)
+    start_time = time.monotonic()
+    size, validator, supports_ranges = _probe(url, headers)
+
+    if not supports_ranges or not size:
+        # The server can't send ranges, so fetch it in one go
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        if not file_transfer.download_to_file(url, headers, destination):
+            raise OSError(f"Error downloading {url}")
+    else:
+        state = _load_state(state_path, url, size, validator) if os.path.exists(part_path) else None
+        if state is not None:
+            resumed = sum(part[2] for part in state['parts'])
+            print(f"Resuming download from {resumed * 100 // size}%...")
+        else:
+            state = {'url': url, 'size': size, 'validator': validator, 'parts': _split(size, parts)}
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+            _save_state(state_path, state)
+
+        state_lock = threading.Lock()
+        last_save = [time.monotonic()]
+
+        def on_progress():
+            # Save how far each part got every so often, rather than after every block
+            if time.monotonic() - last_save[0] >= state_save_interval:
+                with state_lock:
+                    if time.monotonic() - last_save[0] >= state_save_interval:
+                        last_save[0] = time.monotonic()
+                        _save_state(state_path, state)
+
+        errors = []
+
+        def run_part(part):
+            try:
+                _download_part(url, headers, part_path, part, state_lock, on_progress)
+            except OSError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run_part, args=(part,), daemon=True) for part in state['parts']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with state_lock:
+            _save_state(state_path, state)
+        if errors:
+            raise OSError(f"Download incomplete, it will resume next time: {errors[0]}")
+
+        os.replace(part_path, destination)
+        os.remove(state_path)
+
+    if expected_sha256 is not None:
+        actual_sha256 = _file_sha256(destination)
+        if actual_sha256 != expected_sha256.lower():
+            os.remove(destination)
+            raise ValueError(f"Downloaded file does not match its published SHA-256 (expected {expected_sha256}, "
+                             f"got {actual_sha256})")
+    downloaded = os.path.getsize(destination)
+    print(f"Downloaded {os.path.basename(destination)}: "
+          f"{file_transfer.throughput_message(downloaded, time.monotonic() - start_time)}.")
@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import sys
+
+import delta_patch
+
+# Variable Declaration
+manifest_asset_name = "release-manifest.json"
+manifest_version = 1
+max_patch_ratio = 0.5  # a patch bigger than this share of its component isn't worth publishing
+hash_chunk_size = 1024 * 1024
+
+
+# Function to get the SHA-256 of a file, or None if it doesn't exist
+def file_sha256(path):
+    if not os.path.exists(path):
+        return None
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(hash_chunk_size):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# Function to get the name a patch from one version of a component to another is published under
+def patch_asset_name(component, from_sha256):
+    return f"{component}.from-{from_sha256[:12]}.patch"
+
+
+# Function to build the manifest of a release from its build folder. Each component is listed with its hash and
+# size, and for every earlier build given, a binary patch from that build's copy is written to output_dir and listed
+# too (when it is small enough to be worth it). Every file the manifest names has to be uploaded as a release asset.
+def create_manifest(version, build_dir, components, previous_build_dirs=(), output_dir=None):
+    output_dir = output_dir or build_dir
+    manifest = {"version": manifest_version, "release": version, "components": {}}
+    for component in components:
+        path = os.path.join(build_dir, component)
+        size = os.path.getsize(path)
+        entry = {"sha256": file_sha256(path), "size": size, "asset": component, "patches": {}}
+        for previous_build_dir in previous_build_dirs:
+            previous_path = os.path.join(previous_build_dir, component)
+            previous_sha256 = file_sha256(previous_path)
+            if previous_sha256 is None or previous_sha256 == entry['sha256'] or previous_sha256 in entry['patches']:
+                continue
+            patch_name = patch_asset_name(component, previous_sha256)
+            patch_path = os.path.join(output_dir, patch_name)
+            signature = delta_patch.compute_signature(previous_path, component)
+            delta_patch.write_delta(signature, path, patch_path)
+            patch_size = os.path.getsize(patch_path)
+            if patch_size > size * max_patch_ratio:
+                os.remove(patch_path)
+                continue
+            entry['patches'][previous_sha256] = {"asset": patch_name, "sha256": file_sha256(patch_path),
+                                                 "size": patch_size}
+        manifest['components'][component] = entry
+
+    with open(os.path.join(output_dir, manifest_asset_name), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+# Function to list the components whose installed copy differs from the release, as (name, entry, installed SHA-256)
+def changed_components(manifest, app_dir):
+    if manifest.get('version') != manifest_version:
+        raise ValueError("The release manifest is from an unsupported version")
+    changed = []
+    for component, entry in manifest['components'].items():
+        installed_sha256 = file_sha256(os.path.join(app_dir, component))
+        if installed_sha256 != entry['sha256']:
+            changed.append((component, entry, installed_sha256))
+    return changed
+
+
+# Build a manifest for a release: release_manifest.py <version> <build folder> [earlier build folders...]
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: release_manifest.py <version> <build folder> [earlier build folders...]")
+        sys.exit(1)
+    release_build_dir = sys.argv[2]
+    release_components = sorted(name for name in os.listdir(release_build_dir)
+                                if name.endswith(('.exe', '.ico')))
+    created = create_manifest(sys.argv[1], release_build_dir, release_components, sys.argv[3:])
+    for name, component_entry in created['components'].items():
+        print(f"{name}: {component_entry['size']} bytes, {len(component_entry['patches'])} patch(es)")
@@ -0,0 +1,99 @@
+import threading
+
+import github_client
+
+# Variable Declaration
+branch_name = "main"
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+# Function to fetch a git tree from GitHub, returning its entries and whether GitHub truncated the listing
+def _fetch_tree(repo, headers, tree_ref, recursive):
+    url = f"https://api.github.com/repos/{repo}/git/trees/{tree_ref}"
+    params = {'recursive': 1} if recursive else None
+    response = github_client.get(url, headers=headers, params=params)
+
+    if response.status_code == 200:
+        tree_info = response.json()
+        return tree_info['tree'], tree_info.get('truncated', False)
+    else:
+        print(f"Error fetching repository tree {tree_ref}: {response.status_code}")
+        return None, False
+
+
+# Function to walk the tree one directory at a time, used when the recursive listing is too big for GitHub
+def _fetch_tree_by_directory(repo, headers, tree_ref, prefix, snapshot):
+    entries, _ = _fetch_tree(repo, headers, tree_ref, recursive=False)
+    if entries is None:
+        return False
+    for entry in entries:
+        path = prefix + entry['path']
+        if entry['type'] == 'blob':
+            snapshot[path] = (entry['sha'], entry['size'])
+        elif entry['type'] == 'tree':
+            if not _fetch_tree_by_directory(repo, headers, entry['sha'], path + '/', snapshot):
+                return False
+    return True
+
+
+# Function to fetch every file in the repository as path -> (blob sha, size) with one API call
+def fetch_remote_snapshot(repo, headers):
+    entries, truncated = _fetch_tree(repo, headers, branch_name, recursive=True)
+    if entries is None:
+        return None
+
+    snapshot = {}
+    if truncated:
+        print("Repository tree is too large for a single listing, fetching it per directory...")
+        if not _fetch_tree_by_directory(repo, headers, branch_name, "", snapshot):
+            return None
+        return snapshot
+
+    for entry in entries:
+        if entry['type'] == 'blob':
+            snapshot[entry['path']] = (entry['sha'], entry['size'])
+    return snapshot
+
+
+# Function to group snapshot paths by parent directory as {directory: {path: 'file' or 'dir'}}
+def group_snapshot_by_directory(snapshot):
+    directories = {}
+    for file_path in sorted(snapshot):
+        parts = file_path.split('/')
+        for depth in range(len(parts)):
+            parent = '/'.join(parts[:depth])
+            entry_type = 'file' if depth == len(parts) - 1 else 'dir'
+            directories.setdefault(parent, {})['/'.join(parts[:depth + 1])] = entry_type
+    return directories
+
+
+# Function to get the shared snapshot, fetching it if needed (refresh=True starts a new check cycle)
+def get_remote_snapshot(repo, headers, refresh=False):
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None or refresh:
+            _snapshot = fetch_remote_snapshot(repo, headers)
+        return _snapshot
+
+
+# Function to record a file that was uploaded during the current cycle
+def update_remote_snapshot(path, sha, size):
+    with _snapshot_lock:
+        if _snapshot is not None:
+            _snapshot[path] = (sha, size)
+
+
+# Function to forget a file that was deleted during the current cycle
+def remove_from_remote_snapshot(path):
+    with _snapshot_lock:
+        if _snapshot is not None:
+            _snapshot.pop(path, None)
+
+
+# Function to drop the snapshot so the next lookup fetches a fresh one
+def invalidate_remote_snapshot():
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
@@ -0,0 +1,142 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import threading
+
+import check_pipeline
+import state_db
+
+# Variable Declaration
+tracking_file = 'files_to_track.json'
+save_delay = 0.5  # seconds, changes made within this long of each other are written together
+default_settings = {
+    "do_setup": True,
+    "blacklist": [],
+    "process_watchlist": [],
+    "file_check_interval": 60,  # minutes
+    "process_check_interval": 5,  # seconds
+    "show_console_if_input": True,
+    "compare_mode": "blob_sha",
+    "check_workers": dict(check_pipeline.default_workers),
+    "http_timeouts": {"connect": 10, "read": 60},
+    "watch_for_changes": True,
+    "file_options": {}
+}
+obsolete_settings = [
+    'whitelist',
+    'game_check_interval'  # Replaced by 'process_check_interval' (seconds)
+]
+
+_settings = None
+_fingerprint = None  # (mtime, size) of the file when it was last read or written
+_dirty = False
+_save_timer = None
+_lock = threading.RLock()
+
+
+def _print_and_log(message):
+    print(message)
+    logging.info(message)
+
+
+# Function to get what is needed to tell if another process changed the file
+def _file_fingerprint():
+    try:
+        stat_result = os.stat(tracking_file)
+    except FileNotFoundError:
+        return None
+    return stat_result.st_mtime_ns, stat_result.st_size
+
+
+# Function to add missing settings and remove obsolete ones in one pass, returning True if anything changed
+def _migrate(settings):
+    changed = False
+    for key, default in default_settings.items():
+        if key not in settings:
+            settings[key] = copy.deepcopy(default)
+            _print_and_log(f"Added '{key}' setting.")
+            changed = True
+    for key in obsolete_settings:
+        if key in settings:
+            del settings[key]
+            changed = True
+    return changed
+
+
+# Function to get the settings. They are kept in memory and only read again if another process changed the file
+# (unless there are changes here that haven't been written yet, which win).
+def load_settings(silent=False):
+    global _settings
+    with _lock:
+        fingerprint = _file_fingerprint()
+        if _settings is not None and (fingerprint == _fingerprint or _dirty):
+            return _settings
+
+        if fingerprint is None:
+            settings = copy.deepcopy(default_settings)
+            _print_and_log("File not found. Created new default tracking file.")
+            changed = True
+        else:
+            with open(tracking_file, 'r') as f:
+                settings = json.load(f)
+            if not silent:
+                _print_and_log("Successfully loaded tracking file.")
+            changed = _migrate(settings)
+
+        # Tracked files live in the state database, move over any that are still in the settings file
+        files_to_track = settings.pop('files_to_track', None)
+        if files_to_track:
+            state_db.import_tracked_files(files_to_track)
+            _print_and_log(f"Moved {len(files_to_track)} tracked file(s) into {state_db.database_file}.")
+        changed = changed or files_to_track is not None
+        settings['files_to_track'] = state_db.tracked_files()
+
+        _settings = settings
+        if changed:
+            _write()
+        return _settings
+
+
+# Function to mark the settings as changed, they are written shortly after so several changes cost one write
+def save_settings(settings=None):
+    global _settings, _dirty, _save_timer
+    with _lock:
+        if settings is not None:
+            _settings = settings
+        _dirty = True
+        if _save_timer is None:
+            _save_timer = threading.Timer(save_delay, flush_settings)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+
+# Function to write any changes that are waiting straight away
+def flush_settings():
+    global _save_timer
+    with _lock:
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+        if _dirty and _settings is not None:
+            _write()
+
+
+# Function to write the settings to a temporary file and rename it over the old one, so the file is never left
+# half written
+def _write():
+    global _fingerprint, _dirty
+    temp_file = tracking_file + ".tmp"
+    with open(temp_file, 'w') as f:
+        # Tracked files are written to the state database as they change
+        json.dump({key: value for key, value in _settings.items() if key != 'files_to_track'}, f,
+                  separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, tracking_file)
+    _fingerprint = _file_fingerprint()
+    _dirty = False
+
+
+atexit.register(flush_settings)
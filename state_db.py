@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+
+# Variable Declaration
+database_file = 'file_backup.db'
+history_limit = 100  # sync history entries kept per file
+synced_outcomes = ('downloaded', 'uploaded', 'identical')  # outcomes that mean both copies matched
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracked_files (
+    github_file TEXT PRIMARY KEY,
+    local_file TEXT NOT NULL,
+    local_key TEXT NOT NULL,
+    local_hash TEXT,
+    remote_hash TEXT,
+    last_sync REAL,
+    last_outcome TEXT
+);
+CREATE INDEX IF NOT EXISTS tracked_files_local_key ON tracked_files (local_key);
+CREATE TABLE IF NOT EXISTS sync_history (
+    id INTEGER PRIMARY KEY,
+    github_file TEXT NOT NULL,
+    time REAL NOT NULL,
+    action TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    local_hash TEXT,
+    remote_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS sync_history_file_time ON sync_history (github_file, time);
+CREATE TABLE IF NOT EXISTS tracked_roots (
+    github_folder TEXT PRIMARY KEY,
+    local_root TEXT NOT NULL,
+    patterns TEXT NOT NULL,
+    scan_cache TEXT
+);
+"""
+
+_connection = None
+_lock = threading.RLock()
+
+
+# Function to normalise a local path so the same file is found however its path was typed
+def _local_key(local_file):
+    return os.path.normcase(os.path.abspath(local_file))
+
+
+# Function to get the shared connection, creating the tables the first time
+def get_connection():
+    global _connection
+    with _lock:
+        if _connection is None:
+            _connection = sqlite3.connect(database_file, check_same_thread=False)
+            # The CLI and the background app use the database at the same time
+            _connection.execute("PRAGMA journal_mode=WAL")
+            _connection.execute("PRAGMA synchronous=NORMAL")
+            _connection.execute("PRAGMA busy_timeout=5000")
+            _connection.executescript(SCHEMA)
+        return _connection
+
+
+# Function to run a statement and commit it
+def _execute(sql, parameters=()):
+    with _lock:
+        connection = get_connection()
+        with connection:
+            return connection.execute(sql, parameters)
+
+
+# Function to run a query and get every row
+def _query(sql, parameters=()):
+    with _lock:
+        return get_connection().execute(sql, parameters).fetchall()
+
+
+# Tracked files as a dict of GitHub path -> local path, every change is written to the database straight away
+class TrackedFiles(MutableMapping):
+    def __getitem__(self, github_file):
+        rows = _query("SELECT local_file FROM tracked_files WHERE github_file = ?", (github_file,))
+        if not rows:
+            raise KeyError(github_file)
+        return rows[0][0]
+
+    def __setitem__(self, github_file, local_file):
+        _execute("INSERT INTO tracked_files (github_file, local_file, local_key) VALUES (?, ?, ?) "
+                 "ON CONFLICT (github_file) DO UPDATE SET local_file = excluded.local_file, "
+                 "local_key = excluded.local_key",
+                 (github_file, local_file, _local_key(local_file)))
+
+    def __delitem__(self, github_file):
+        if _execute("DELETE FROM tracked_files WHERE github_file = ?", (github_file,)).rowcount == 0:
+            raise KeyError(github_file)
+
+    def __contains__(self, github_file):
+        return bool(_query("SELECT 1 FROM tracked_files WHERE github_file = ?", (github_file,)))
+
+    def __iter__(self):
+        return iter([row[0] for row in _query("SELECT github_file FROM tracked_files ORDER BY rowid")])
+
+    def __len__(self):
+        return _query("SELECT COUNT(*) FROM tracked_files")[0][0]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    # One query instead of one per file
+    def items(self):
+        return _query("SELECT github_file, local_file FROM tracked_files ORDER BY rowid")
+
+    def values(self):
+        return [row[0] for row in _query("SELECT local_file FROM tracked_files ORDER BY rowid")]
+
+    # Function to find which GitHub path a local file is tracked under, or None if it isn't tracked
+    def find_github_file(self, local_file):
+        rows = _query("SELECT github_file FROM tracked_files WHERE local_key = ?", (_local_key(local_file),))
+        return rows[0][0] if rows else None
+
+
+# Function to get the tracked files
+def tracked_files():
+    return TrackedFiles()
+
+
+# Function to move tracked files over from the old settings file, keeping any already in the database
+def import_tracked_files(files_to_track):
+    with _lock:
+        connection = get_connection()
+        with connection:
+            connection.executemany("INSERT OR IGNORE INTO tracked_files (github_file, local_file, local_key) "
+                                   "VALUES (?, ?, ?)",
+                                   [(github_file, local_file, _local_key(local_file))
+                                    for github_file, local_file in files_to_track.items()])
+
+
+# Function to record the outcome of syncing a file, in its tracking entry and its history
+def record_sync(github_file, action, outcome, local_hash=None, remote_hash=None):
+    now = time.time()
+    with _lock:
+        connection = get_connection()
+        with connection:
+            connection.execute("UPDATE tracked_files SET last_sync = ?, last_outcome = ?, "
+                               "local_hash = COALESCE(?, local_hash), remote_hash = COALESCE(?, remote_hash) "
+                               "WHERE github_file = ?",
+                               (now, outcome, local_hash, remote_hash, github_file))
+            connection.execute("INSERT INTO sync_history (github_file, time, action, outcome, local_hash, remote_hash) "
+                               "VALUES (?, ?, ?, ?, ?, ?)",
+                               (github_file, now, action, outcome, local_hash, remote_hash))
+            # Only keep the most recent entries for each file
+            connection.execute("DELETE FROM sync_history WHERE github_file = ? AND id NOT IN "
+                               "(SELECT id FROM sync_history WHERE github_file = ? ORDER BY time DESC LIMIT ?)",
+                               (github_file, github_file, history_limit))
+
+
+# Function to get the last known state of a tracked file, or None if it isn't tracked
+def get_file_state(github_file):
+    rows = _query("SELECT local_file, local_hash, remote_hash, last_sync, last_outcome FROM tracked_files "
+                  "WHERE github_file = ?", (github_file,))
+    if not rows:
+        return None
+    local_file, local_hash, remote_hash, last_sync, last_outcome = rows[0]
+    return {'local_file': local_file, 'local_hash': local_hash, 'remote_hash': remote_hash,
+            'last_sync': last_sync, 'last_outcome': last_outcome}
+
+
+# Function to get the most recent sync history of a file, newest first
+def get_sync_history(github_file, limit=10):
+    rows = _query("SELECT time, action, outcome, local_hash, remote_hash FROM sync_history WHERE github_file = ? "
+                  "ORDER BY time DESC LIMIT ?", (github_file, limit))
+    return [{'time': row[0], 'action': row[1], 'outcome': row[2], 'local_hash': row[3], 'remote_hash': row[4]}
+            for row in rows]
+
+
+# Function to check if a file was synced here before, going by its last outcome that wasn't a skip. A failed
+# transfer doesn't count, so a file whose first download or upload failed is tried again.
+def was_synced(github_file):
+    rows = _query("SELECT outcome FROM sync_history WHERE github_file = ? AND outcome != 'skipped' "
+                  "ORDER BY time DESC LIMIT 1", (github_file,))
+    return bool(rows) and rows[0][0] in synced_outcomes
+
+
+# Function to track a whole directory under a GitHub folder, patterns are .gitignore-style excludes
+def add_tracked_root(github_folder, local_root, patterns=()):
+    _execute("INSERT INTO tracked_roots (github_folder, local_root, patterns) VALUES (?, ?, ?) "
+             "ON CONFLICT (github_folder) DO UPDATE SET local_root = excluded.local_root, "
+             "patterns = excluded.patterns, scan_cache = NULL",
+             (github_folder, local_root, json.dumps(list(patterns))))
+
+
+# Function to stop tracking a directory, returning False if it wasn't tracked
+def remove_tracked_root(github_folder):
+    return _execute("DELETE FROM tracked_roots WHERE github_folder = ?", (github_folder,)).rowcount > 0
+
+
+# Function to get the tracked directories
+def get_tracked_roots():
+    rows = _query("SELECT github_folder, local_root, patterns, scan_cache FROM tracked_roots ORDER BY rowid")
+    return [{'github_folder': row[0], 'local_root': row[1], 'patterns': json.loads(row[2]),
+             'scan_cache': json.loads(row[3]) if row[3] else None}
+            for row in rows]
+
+
+# Function to remember what each folder of a tracked directory contained, so the next scan can skip unchanged ones
+def save_scan_cache(github_folder, scan_cache):
+    _execute("UPDATE tracked_roots SET scan_cache = ? WHERE github_folder = ?",
+             (json.dumps(scan_cache, separators=(',', ':')), github_folder))
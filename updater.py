@@ -9,32 +9,48 @@ application_name = "FileBackup_Data.exe"
 launcher_name = "FileBackup_Launcher.exe"
 background_name = "FileBackup_Background.exe"
 icon_name = "icon.ico"
+component_names = [launcher_name, application_name, background_name, icon_name]
+backup_folder_name = "previous_version"
+version_file_name = "version.txt"  # read by the launcher instead of running the app to ask its version
 
 
-# Function to replace the outdated files
+# Function to swap the staged files in. Only files that were staged (the ones that changed) are replaced. Each current
+# file is first moved into a backup folder, and if anything fails every file already swapped is put back, so the app
+# is never left half updated.
 def replace_files(extract_folder, app_dir):
-    # Replace necessary files
-    new_launcher_path = os.path.join(extract_folder, launcher_name)
-    new_data_path = os.path.join(extract_folder, application_name)
-    new_background_path = os.path.join(extract_folder, background_name)
-    new_icon_path = os.path.join(extract_folder, icon_name)
-
-    current_launcher_path = os.path.join(app_dir, launcher_name)
-    current_data_path = os.path.join(app_dir, application_name)
-    current_background_path = os.path.join(app_dir, background_name)
-    current_icon_path = os.path.join(app_dir, icon_name)
-
-    if os.path.exists(new_launcher_path):
-        shutil.move(new_launcher_path, current_launcher_path)
-
-    if os.path.exists(new_data_path):
-        shutil.move(new_data_path, current_data_path)
-
-    if os.path.exists(new_background_path):
-        shutil.move(new_background_path, current_background_path)
-
-    if os.path.exists(new_icon_path):
-        shutil.move(new_icon_path, current_icon_path)
+    backup_folder = os.path.join(extract_folder, backup_folder_name)
+    os.makedirs(backup_folder, exist_ok=True)
+    replaced = []  # (name, whether there was a current file that was backed up)
+    try:
+        for name in component_names:
+            new_path = os.path.join(extract_folder, name)
+            if not os.path.exists(new_path):
+                continue
+            current_path = os.path.join(app_dir, name)
+            had_current = os.path.exists(current_path)
+            if had_current:
+                os.replace(current_path, os.path.join(backup_folder, name))
+            replaced.append((name, had_current))
+            os.replace(new_path, current_path)
+    except BaseException:
+        for name, had_current in reversed(replaced):
+            new_path = os.path.join(extract_folder, name)
+            current_path = os.path.join(app_dir, name)
+            if not os.path.exists(new_path) and os.path.exists(current_path):
+                # The new file was swapped in, move it back to the staging folder so a retry can use it
+                os.replace(current_path, new_path)
+            if had_current:
+                os.replace(os.path.join(backup_folder, name), current_path)
+        raise
+
+
+# Function to record the version that was just installed
+def write_version_file(app_dir, version):
+    version_path = os.path.join(app_dir, version_file_name)
+    temp_path = version_path + ".tmp"
+    with open(temp_path, 'w') as f:
+        f.write(version)
+    os.replace(temp_path, version_path)
 
 
 # Function to remove the update zip and temp folder
@@ -74,6 +90,7 @@ def main():
             try:
                 # Replace launcher and data files
                 replace_files(extract_folder, app_dir)
+                write_version_file(app_dir, os.path.basename(extract_folder).replace("update_", "", 1))
 
                 # Clean up the update folder and zip file
                 cleanup(extract_folder, zip_file)